@@ -11,16 +11,33 @@ Only multi-line *English* (post-filter) triggers yellow.
 """
 
 import argparse
+import csv
+import hashlib
+import json
 import logging
+import math
+import os
 import re
+import sqlite3
 import subprocess
 import sys
+import tempfile
+import time
 import unicodedata
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Set, Union
 
-import pdfplumber
-import pandas as pd
+from strike_marks import GUTTER_X1, MARK_ABOVE, MARK_BELOW, RED, get_deleted_indices
+
+# pdfplumber and xlsxwriter are imported by the code that needs them, so
+# --help, argument errors and parse-cache hits start without them
+if TYPE_CHECKING:
+    import pdfplumber
+    import xlsxwriter
 
 # ──────────────────────────────────────────────────────────────────────────────
 BLANK_WIDTHS = [4.22, 16.67, 43.47, 18.22, 17.78, 6.78, 13.78, 13.78, 13.78]
@@ -32,10 +49,105 @@ SMALL_WIDTH = 4.36
 TOTAL_WIDTH = 21.18  # fixed width for Part-Type area
 PART_NAME_W = 43.55
 START_ROW = 14  # zero-indexed: Excel row 15
+CANVAS_COLS = 50  # grey background spans at least this many columns
+DATA_ROW_H = 32.3
 
 JAPANESE_RE = re.compile(r"[\u3000-\u30FF\u4E00-\u9FAF]")
 CUT_THRESHOLD = 3
 
+# table column indexes used when the header row does not name a column
+COLUMN_FALLBACKS: Dict[str, Optional[int]] = {
+    'part_number': 6,
+    'part_name': 19,
+    'quantity': None,
+    'change': None,
+    'note': None,
+}
+
+# ───────────── PROFILING ─────────────
+class StageProfile:
+    """Wall and CPU seconds per pipeline stage, in total and per page (--profile).
+
+    Disabled by default, and then :meth:`stage`, :meth:`laps` and
+    :meth:`page` time nothing. Only stages run in this process are seen.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stages: Dict[str, List[float]] = {}  # stage -> [wall, cpu, calls]
+        self.pages: List[Dict] = []
+        self._page: Optional[Dict] = None
+        self._t0 = (0.0, 0.0)
+
+    def enable(self) -> None:
+        self.enabled = True
+        self._t0 = (time.perf_counter(), time.process_time())
+
+    def _add(self, name: str, wall: float, cpu: float) -> None:
+        total = self.stages.setdefault(name, [0.0, 0.0, 0])
+        total[0] += wall
+        total[1] += cpu
+        total[2] += 1
+        if self._page is not None:
+            st = self._page['stages'].setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            st['wall'] += wall
+            st['cpu'] += cpu
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Charge the time spent in the ``with`` block to stage ``name``."""
+        if not self.enabled:
+            yield
+            return
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - w0, time.process_time() - c0)
+
+    def laps(self) -> Callable[[str], None]:
+        """A ``lap(name)`` function charging the time since its previous call to stage ``name``."""
+        if not self.enabled:
+            return lambda name: None
+        last = [time.perf_counter(), time.process_time()]
+
+        def lap(name: str) -> None:
+            wall, cpu = time.perf_counter(), time.process_time()
+            self._add(name, wall - last[0], cpu - last[1])
+            last[:] = wall, cpu
+        return lap
+
+    @contextmanager
+    def page(self, pdf: str, number: int) -> Iterator[None]:
+        """Record a per-page entry for the stages run inside the ``with`` block."""
+        if not self.enabled:
+            yield
+            return
+        rec: Dict = {'pdf': pdf, 'page': number, 'stages': {}}
+        self._page = rec
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            rec['wall'], rec['cpu'] = time.perf_counter() - w0, time.process_time() - c0
+            self._page = None
+            self.pages.append(rec)
+
+    def report(self) -> Dict:
+        r = lambda x: round(x, 6)
+        for rec in self.pages:
+            rec['wall'], rec['cpu'] = r(rec['wall']), r(rec['cpu'])
+            for st in rec['stages'].values():
+                st['wall'], st['cpu'] = r(st['wall']), r(st['cpu'])
+        return {
+            'wall': r(time.perf_counter() - self._t0[0]),
+            'cpu': r(time.process_time() - self._t0[1]),
+            'stages': {name: {'wall': r(w), 'cpu': r(c), 'calls': n} for name, (w, c, n) in self.stages.items()},
+            'pages': self.pages,
+        }
+
+PROFILE = StageProfile()
+
 # ───────────── NOTE handling ─────────────
 _TRIVIAL_NOTE_REGEX = re.compile(
     r"^\s*(欠図\s*)?(in\s+preparation)\s*$",
@@ -80,46 +192,6 @@ def normalize_note(s: str) -> str:
     s = s.strip(" ;:-")
     return s.lower()
 
-# ───────────── RED/STRIKE DELETION DETECTION ─────────────
-def get_deleted_indices(page: pdfplumber.page.Page) -> Set[int]:
-    """Find gutter indices marked red (line/text) and return set of ints (e.g., 68 from '68.1')."""
-    deleted: Set[int] = set()
-
-    for l in getattr(page, "lines", []):
-        if l.get('stroking_color') == (1.0, 0.0, 0.0):
-            s = page.crop((0, l['top'] - 13, 103, l['bottom'] + 10)).extract_text()
-            if s:
-                m = re.search(r"\d+", s)
-                if m:
-                    try:
-                        deleted.add(int(m.group(0)))
-                    except ValueError:
-                        pass
-
-    for c in getattr(page, "curves", []):
-        if c.get('stroking_color') == (1.0, 0.0, 0.0):
-            s = page.crop((0, c['top'] - 13, 103, c['bottom'] + 10)).extract_text()
-            if s:
-                m = re.search(r"\d+", s)
-                if m:
-                    try:
-                        deleted.add(int(m.group(0)))
-                    except ValueError:
-                        pass
-
-    for ch in getattr(page, "chars", []):
-        if ch.get('non_stroking_color') == (1.0, 0.0, 0.0) and ch.get('x0', 9999) < 103:
-            s = page.crop((0, ch['top'] - 13, 103, ch['bottom'] + 10)).extract_text()
-            if s:
-                m = re.search(r"\d+", s)
-                if m:
-                    try:
-                        deleted.add(int(m.group(0)))
-                    except ValueError:
-                        pass
-
-    return deleted
-
 def parse_index_int(idx_text: str) -> Optional[int]:
     m = re.match(r"^(\d+)", idx_text.strip())
     if not m:
@@ -129,288 +201,1252 @@ def parse_index_int(idx_text: str) -> Optional[int]:
     except ValueError:
         return None
 
-# ───────────── PDF PARSE ─────────────
-def parse_bom_pdf(pdf_path: Path) -> List[Dict]:
-    entries: List[Dict] = []
-    with pdfplumber.open(str(pdf_path)) as pdf:
-        for page in pdf.pages:
-            deleted_idxs = get_deleted_indices(page)
-
-            tbls = page.extract_tables()
-            if not tbls:
-                continue
-            tbl = tbls[0]
-
-            # locate header row
-            hdr_i = next(
-                (
-                    i for i, row in enumerate(tbl[:6])
-                    if any(clean_cell(c).lower().startswith("level") for c in row)
-                       and any(clean_cell(c).lower().startswith("part number") for c in row)
-                ),
-                2
-            )
-            hdr = tbl[hdr_i]
-
-            # map columns
-            cmap: Dict[str, int] = {}
-            for ci, cell in enumerate(hdr):
-                txt = clean_cell(cell).lower()
-                if "part number" in txt:
-                    cmap['part_number'] = ci
-                elif "part name" in txt:
-                    cmap['part_name'] = ci
-                elif "qty" in txt:
-                    cmap['quantity'] = ci
-                elif "change" in txt or txt.startswith("rev"):
-                    cmap['change'] = ci
-                elif "note" in txt or "備" in txt:  # 備考 NOTE
-                    cmap['note'] = ci
-            cmap.setdefault('part_number', 6)
-            cmap.setdefault('part_name', 19)
-            cmap.setdefault('quantity', None)
-            cmap.setdefault('change', None)
-            cmap.setdefault('note', None)
-
-            # extract entries
-            for row in tbl[hdr_i + 1:]:
-                idx = clean_cell(row[0])
-                if not idx or not re.match(r"^\d+(?:\.\d+)?$", idx):
-                    continue
+# ───────────── PARSE METRICS ─────────────
+class PageMetricsLog:
+    """JSON-lines sink for per-page parse metrics (--metrics).
+
+    One record per parsed page: ``pdf``, ``page``, ``header`` (``detected``,
+    ``fallback`` to row 2, ``template``, ``words`` or ``no_table``), ``rows_seen``,
+    ``rows_accepted``, ``rows_deleted`` (red-struck), ``outline_skipped``,
+    ``flag_multiline_en``, ``flag_note_used`` and ``seconds``. Each record is
+    one append-mode write and the sink holds only its path, so worker
+    processes can share it; records of parallel runs may interleave.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def write(self, record: Dict) -> None:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+# ───────────── DOCUMENT SESSION ─────────────
+class BomDocument:
+    """A BOM PDF opened once and laid out once per page.
+
+    Every consumer (table parser, red-strike detector, metadata scan) works on
+    the page objects handed out by :meth:`pages`, so pdfminer lays out each
+    page a single time; the page's caches are released as soon as the caller
+    moves on to the next one, which keeps memory flat in the page count.
+    """
+
+    def __init__(self, pdf_path: Path, use_template: bool = False,
+                 metrics: Optional[PageMetricsLog] = None, engine: str = 'tables'):
+        import pdfplumber
+
+        self.path = Path(pdf_path)
+        with PROFILE.stage('pdf_open'):
+            self._pdf = pdfplumber.open(str(self.path))
+        # pdfminer otherwise keeps every decoded content stream for the life of the
+        # file, so memory would grow with the page count despite page.close()
+        self._pdf.doc.caching = False
+        self.use_template = use_template
+        self.template: Optional[TableTemplate] = None
+        self.metrics = metrics
+        self.engine = engine
+        self._meta: Optional[Tuple[str, str]] = None
+        self._meta_lines: List[str] = []
+        self._meta_tail = ""
+
+    def __enter__(self) -> "BomDocument":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._pdf.close()
+
+    @property
+    def page_count(self) -> int:
+        return len(self._pdf.pages)
+
+    def pages(self, idxs: Optional[Iterable[int]] = None) -> Iterator["pdfplumber.page.Page"]:
+        """Yield pages (all, or ``idxs``) and flush each one's layout cache after use."""
+        for i in (range(self.page_count) if idxs is None else idxs):
+            page = self._pdf.pages[i]
+            with PROFILE.page(self.path.name, i + 1):
+                if PROFILE.enabled:
+                    with PROFILE.stage('page_layout'):
+                        page.objects  # lay the page out here, so later stages time only their own work
+                try:
+                    yield page
+                finally:
+                    page.close()
+
+    # metadata: the 'PRODUCT NUMBER … CUSTOMER' line is on the first page in practice,
+    # so the text scan stops as soon as it is found instead of reading every page.
+    def feed_metadata(self, page: "pdfplumber.page.Page") -> None:
+        """Add a page's text to the metadata scan, unless it is already resolved."""
+        if self._meta is not None:
+            return
+        # page texts are concatenated without a separator, so the last line of a
+        # page may continue on the next one; hold it back until then
+        with PROFILE.stage('metadata_scan'):
+            text = page.extract_text() or ""
+        pieces = (self._meta_tail + text).splitlines(keepends=True)
+        self._meta_tail = pieces.pop() if pieces and pieces[-1].splitlines() == [pieces[-1]] else ""
+        start = len(self._meta_lines)
+        self._meta_lines.extend(ln.strip() for ln in pieces if ln.strip())
+        self._meta = _find_metadata(self._meta_lines, start)
+
+    @property
+    def metadata(self) -> Tuple[str, str]:
+        """(customer, product) from the pages fed so far; ("", "") if absent."""
+        if self._meta is not None:
+            return self._meta
+        lines = self._meta_lines + ([self._meta_tail.strip()] if self._meta_tail.strip() else [])
+        return _find_metadata(lines, len(self._meta_lines)) or ("", "")
+
+    def scan_metadata(self) -> Tuple[str, str]:
+        """Feed pages until the metadata line is found (or the document ends)."""
+        for page in self.pages():
+            self.feed_metadata(page)
+            if self._meta is not None:
+                break
+        return self.metadata
+
+# ───────────── TABLE TEMPLATE ─────────────
+_ITEM_RE = re.compile(r"^\d+(?:\.\d+)?$")
+EDGE_TOL = 1.0  # pt; learned geometry must line up with the page's ruling within this
+
+def _table_edges(page: "pdfplumber.page.Page") -> List[Dict]:
+    """Ruling edges as pdfplumber's default 'lines' table strategy sees them (snapped and joined)."""
+    from pdfplumber.table import merge_edges
+    from pdfplumber.utils import filter_edges
+
+    edges = filter_edges(page.edges, 'v', min_length=1) + filter_edges(page.edges, 'h', min_length=1)
+    return filter_edges(merge_edges(edges, 3, 3, 3, 3), min_length=3)
+
+def _grid_text(page: "pdfplumber.page.Page", xs: List[float], ys: List[float]) -> List[List[str]]:
+    """Text of the cells between column boundaries ``xs`` and row boundaries ``ys``.
+
+    Chars are bucketed by centre point and each cell is read with the
+    tolerances ``Table.extract`` uses, so a cell reads exactly as it would
+    from a detected table.
+    """
+    from pdfplumber.utils import extract_text
+
+    n_rows, n_cols = len(ys) - 1, len(xs) - 1
+    buckets: List[List[List[Dict]]] = [[[] for _ in range(n_cols)] for _ in range(n_rows)]
+    for ch in page.chars:
+        r = bisect_right(ys, (ch['top'] + ch['bottom']) / 2) - 1
+        c = bisect_right(xs, (ch['x0'] + ch['x1']) / 2) - 1
+        if 0 <= r < n_rows and 0 <= c < n_cols:
+            buckets[r][c].append(ch)
+    return [
+        [extract_text(cell, x_tolerance=3, y_tolerance=3) if cell else "" for cell in row]
+        for row in buckets
+    ]
 
-                # skip if flagged deleted
-                idx_int = parse_index_int(idx)
-                if idx_int is not None and idx_int in deleted_idxs:
-                    continue
+class TableTemplate:
+    """BOM table geometry learned from one page and re-applied to the next ones.
+
+    Holds the x-boundaries of the data columns (item, level 1-5, part number,
+    change, ... note), the header row index and the column map. Reading a page
+    through the template buckets its chars into cells by centre point, the
+    same rule ``Table.extract`` uses, without running table discovery.
+
+    Before a page is read this way, its ruling is checked against the template.
+    Every row boundary must be a full-width line. Every column boundary must be
+    a vertical line through the data rows. There must be no other lines among
+    them, and the rows up to the header must read the same as on the learning
+    page. If any check fails, :meth:`read` returns None and the caller
+    falls back to ``extract_tables()``.
+    """
+
+    def __init__(self, xs: List[float], hdr_i: int, cmap: Dict[str, Optional[int]]):
+        self.xs = xs
+        self.hdr_i = hdr_i
+        self.cmap = cmap
+        self.signature: List[List[str]] = []
+
+    @classmethod
+    def learn(cls, page: "pdfplumber.page.Page", table, tbl: List[List[Optional[str]]],
+              hdr_i: int, cmap: Dict[str, Optional[int]]) -> Optional["TableTemplate"]:
+        """Derive a template from a page's detected ``table`` (``tbl`` is its extract()).
+
+        Returns None when the page cannot be expressed as a template, or when
+        reading the page back through the template does not reproduce ``tbl``.
+        """
+        data_i = next((i for i in range(hdr_i + 1, len(tbl)) if _ITEM_RE.match(clean_cell(tbl[i][0]))), None)
+        if data_i is None:
+            return None
+        cells = table.rows[data_i].cells
+        spans = [(ci, c) for ci, c in enumerate(cells) if c is not None]
+        # the data row must tile the table left to right, with item + 5 level cells first
+        if [ci for ci, _ in spans[:6]] != list(range(6)):
+            return None
+        if any(abs(a[2] - b[0]) > EDGE_TOL for (_, a), (_, b) in zip(spans, spans[1:])):
+            return None
+        xs = [c[0] for _, c in spans] + [spans[-1][1][2]]
+        logical = {ci: k for k, (ci, _) in enumerate(spans)}
+        if any(ci is not None and ci not in logical for ci in cmap.values()):
+            return None
+        tmpl = cls(xs, hdr_i, {col: (None if ci is None else logical[ci]) for col, ci in cmap.items()})
+
+        grid = tmpl._read_grid(page)
+        if grid is None:
+            return None
+        tmpl.signature = grid[:hdr_i + 1]
+        rows = tmpl._check(page, grid)
+        expected = [
+            [row[ci] if ci < len(row) else None for ci, _ in spans]
+            for row in tbl[hdr_i + 1:] if _ITEM_RE.match(clean_cell(row[0]))
+        ]
+        if rows is None or [r for r in rows if _ITEM_RE.match(clean_cell(r[0]))] != expected:
+            return None
+        return tmpl
+
+    def read(self, page: "pdfplumber.page.Page") -> Optional[List[List[str]]]:
+        """Data rows (below the header) of ``page``, or None if the page does not fit."""
+        grid = self._read_grid(page)
+        if grid is None or grid[:self.hdr_i + 1] != self.signature:
+            return None
+        return self._check(page, grid)
+
+    def _read_grid(self, page: "pdfplumber.page.Page") -> Optional[List[List[str]]]:
+        xs = self.xs
+        edges = _table_edges(page)
+        self._h = [e for e in edges if e['orientation'] == 'h']
+        self._v = [e for e in edges if e['orientation'] == 'v']
+        # row boundaries: every ruling line that crosses the item column
+        ys = sorted({e['top'] for e in self._h if e['x0'] <= xs[0] + EDGE_TOL and e['x1'] >= xs[1] - EDGE_TOL})
+        if len(ys) < self.hdr_i + 2:
+            return None
+        self._ys = ys
+        return _grid_text(page, xs, ys)
+
+    def _check(self, page: "pdfplumber.page.Page", grid: List[List[str]]) -> Optional[List[List[str]]]:
+        """Validate the ruling of the data region; return its rows or None."""
+        xs, ys, tol = self.xs, self._ys, EDGE_TOL
+        last = max((r for r in range(self.hdr_i + 1, len(grid)) if _ITEM_RE.match(clean_cell(grid[r][0]))),
+                   default=self.hdr_i)
+        # the header row spans the level columns, so the ruling is checked from the first data row
+        y0, y1 = ys[self.hdr_i + 1], ys[last + 1]
+        x0, x1 = xs[0], xs[-1]
+
+        for y in ys[self.hdr_i + 1:last + 2]:
+            if not any(abs(e['top'] - y) <= tol and e['x0'] <= x0 + tol and e['x1'] >= x1 - tol for e in self._h):
+                return None
+        for x in xs:
+            if not any(abs(e['x0'] - x) <= tol and e['top'] <= y0 + tol and e['bottom'] >= y1 - tol for e in self._v):
+                return None
+        for e in self._v:
+            if (x0 + tol < e['x0'] < x1 - tol and min(e['bottom'], y1) - max(e['top'], y0) > tol
+                    and not any(abs(e['x0'] - x) <= tol for x in xs)):
+                return None
+        for e in self._h:
+            if (y0 + tol < e['top'] < y1 - tol and min(e['x1'], x1) - max(e['x0'], x0) > tol
+                    and not any(abs(e['top'] - y) <= tol for y in ys)):
+                return None
+        return grid[self.hdr_i + 1:last + 1]
+
+# ───────────── WORD ENGINE ─────────────
+ENGINES = ('tables', 'words')
+MIN_DATA_COLUMNS = 8  # item, level 1-5, part number and at least one more
+
+def _snap(values: Iterable[float], tol: float = EDGE_TOL) -> List[float]:
+    """Sorted ``values`` with each run closer than ``tol`` kept as its first value."""
+    out: List[float] = []
+    for v in sorted(values):
+        if not out or v - out[-1] > tol:
+            out.append(v)
+    return out
+
+def read_word_rows(page: "pdfplumber.page.Page"
+                   ) -> Optional[Tuple[List[List[str]], Dict[str, Optional[int]]]]:
+    """The BOM rows of ``page`` and their column map, without table detection.
+
+    The 'LEVEL' header word anchors the table: the ruling lines just above
+    and below it bound the header row, and the vertical lines through the
+    next row are the data columns (item, level 1-5, part number, change, ...
+    note). Row bands are the horizontal lines crossing the item column from
+    the header down. Chars are grouped into those columns and bands and read
+    like table cells, then the header row names the columns.
+
+    Returns None when the page does not look like that (no anchor, too few
+    columns, no part number or part name heading); the caller then runs
+    ``extract_tables()`` instead.
+    """
+    tol = EDGE_TOL
+    anchor = next((w for w in page.extract_words(x_tolerance=3, y_tolerance=3)
+                   if w['text'].upper() == 'LEVEL'), None)
+    if anchor is None:
+        return None
+    h = [e for e in page.edges if e['orientation'] == 'h']
+    v = [e for e in page.edges if e['orientation'] == 'v']
 
-                # detect level (first non-empty among columns 1..5)
-                level = next(
-                    (ci for ci in range(1, 6) if ci < len(row) and clean_cell(row[ci])),
-                    1
-                )
-
-                # raw part-name cell + early check for outline drawing
-                raw = row[cmap['part_name']] if cmap['part_name'] < len(row) else ""
-                raw_lines_all = [ln.strip() for ln in str(raw).splitlines() if ln.strip()]
-                raw_text = " ".join(raw_lines_all).lower()
-                if level == 1 and "outline drawing" in raw_text:
-                    continue
+    around = _snap(e['top'] for e in h if e['x0'] <= anchor['x0'] and e['x1'] >= anchor['x1'])
+    i = bisect_right(around, (anchor['top'] + anchor['bottom']) / 2)
+    if i == 0 or i + 1 >= len(around):
+        return None
+    hdr_top, y0, y1 = around[i - 1], around[i], around[i + 1]
+    below_hdr = [e for e in h if abs(e['top'] - y0) <= tol]
+    left, right = min(e['x0'] for e in below_hdr), max(e['x1'] for e in below_hdr)
+    xs = _snap(e['x0'] for e in v
+               if left - tol <= e['x0'] <= right + tol and e['top'] <= y0 + tol and e['bottom'] >= y1 - tol)
+    if len(xs) < MIN_DATA_COLUMNS + 1:
+        return None
+    ys = _snap(e['top'] for e in h
+               if e['top'] >= hdr_top - tol and e['x0'] <= xs[0] + tol and e['x1'] >= xs[1] - tol)
 
-                # NOTE (備考)
-                note = ""
-                if cmap['note'] is not None and cmap['note'] < len(row):
-                    note = clean_cell(row[cmap['note']])
-                if is_trivial_note(note):
-                    note = ""
-
-                # Build EN content:
-                # Start from everything except the first line (often JP),
-                # then optionally drop the first EN candidate if it’s JP/too-short.
-                content = raw_lines_all[1:] if len(raw_lines_all) > 1 else raw_lines_all[:1]
-                if content:
-                    cand = content[0]
-                    eng = re.sub(r'[^A-Za-z]', '', cand)
-                    if JAPANESE_RE.search(cand) or len(eng) < CUT_THRESHOLD:
-                        content = content[1:]
-
-                # >>> Only flag multiline if we STILL have 2+ EN lines after filtering <<<
-                had_multiline_english = len(content) > 1
-
-                # flatten lines: default add space, join only if true mid-word split
-                flat = ""
-                for i, ln in enumerate(content):
-                    ln = ln.strip()
-                    if i == 0:
-                        flat = ln
-                    else:
-                        if flat and flat[-1].isalpha() and ln and ln[0].isalpha() and not flat.endswith(" "):
-                            flat += ln
-                        else:
-                            flat += " " + ln
-
-                words = strip_non_ascii(flat).split()
-
-                def fmt(w: str) -> str:
-                    if any(ch.isdigit() for ch in w):
-                        return w.upper()
-                    if w.isupper() and len(w) <= CUT_THRESHOLD:
-                        return w
-                    return w.lower().capitalize()
-
-                pname = " ".join(fmt(w) for w in words).strip()
-                if not pname:
-                    continue
+    grid = _grid_text(page, xs, ys)
+    cmap = _map_columns(grid[0])
+    if 'part_number' not in cmap or 'part_name' not in cmap:
+        return None
+    for col, ci in COLUMN_FALLBACKS.items():
+        cmap.setdefault(col, ci)
+    last = max((r for r in range(1, len(grid)) if _ITEM_RE.match(clean_cell(grid[r][0]))), default=0)
+    return grid[1:last + 1], cmap
+
+# ───────────── BOM TABLE ─────────────
+FLAG_MULTILINE_EN = 1  # part name was stitched from several English lines
+FLAG_NOTE_USED = 2     # NOTE/備考 is shown as the part name
+
+class BomTable:
+    """Parsed BOM rows stored column-wise.
+
+    Strings are interned, so a part number or name repeated across pages and
+    variants is held once; level and flags are byte arrays and quantities a
+    double array with NaN for "no quantity". Drawing number and display name
+    are derived (they are the part number and note-or-name respectively).
+    Iterating yields the rows as the entry dicts the parser used to return.
+    """
+
+    __slots__ = ('level', 'part_number', 'part_name', 'note', 'change', 'quantity', 'flags')
+
+    def __init__(self):
+        self.level = array('B')
+        self.part_number: List[str] = []
+        self.part_name: List[str] = []
+        self.note: List[str] = []
+        self.change: List[str] = []
+        self.quantity = array('d')
+        self.flags = array('B')
+
+    def __len__(self) -> int:
+        return len(self.level)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self.record(i) for i in range(len(self)))
+
+    def append(self, level: int, part_number: str, part_name: str, note: str, change: str,
+               quantity: Optional[float], flags: int = 0) -> int:
+        """Add a row and return its index."""
+        self.level.append(level)
+        self.part_number.append(sys.intern(part_number))
+        self.part_name.append(sys.intern(part_name))
+        self.note.append(sys.intern(note))
+        self.change.append(sys.intern(change))
+        self.quantity.append(math.nan if quantity is None else quantity)
+        self.flags.append(flags)
+        return len(self.level) - 1
+
+    def append_row(self, src: "BomTable", i: int) -> int:
+        """Copy row ``i`` of ``src`` and return its index here."""
+        self.level.append(src.level[i])
+        self.part_number.append(src.part_number[i])
+        self.part_name.append(src.part_name[i])
+        self.note.append(src.note[i])
+        self.change.append(src.change[i])
+        self.quantity.append(src.quantity[i])
+        self.flags.append(src.flags[i])
+        return len(self.level) - 1
+
+    def extend(self, other: "BomTable") -> None:
+        for name in self.__slots__:
+            getattr(self, name).extend(getattr(other, name))
+
+    def display_name(self, i: int) -> str:
+        return self.note[i] or self.part_name[i]
+
+    def record(self, i: int) -> Dict:
+        q = self.quantity[i]
+        note = self.note[i]
+        return {
+            'level': self.level[i],
+            'part_name': self.part_name[i],
+            'display_name': note or self.part_name[i],
+            'note': note,
+            'note_norm': normalize_note(note),
+            'part_number': self.part_number[i],
+            'drawing_no': self.part_number[i],
+            'change': self.change[i],
+            'quantity': None if math.isnan(q) else (int(q) if q.is_integer() else q),
+            'flag_multiline_en': bool(self.flags[i] & FLAG_MULTILINE_EN),
+            'flag_note_used': bool(self.flags[i] & FLAG_NOTE_USED),
+        }
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> "BomTable":
+        t = cls()
+        for r in records:
+            flags = ((FLAG_MULTILINE_EN if r.get('flag_multiline_en') else 0)
+                     | (FLAG_NOTE_USED if r.get('flag_note_used') else 0))
+            t.append(r['level'], r['part_number'], r['part_name'], r.get('note', ""),
+                     r['change'], r['quantity'], flags)
+        return t
+
+    def to_columns(self) -> Dict[str, list]:
+        """JSON-safe columns (NaN quantities become null)."""
+        cols = {name: list(getattr(self, name)) for name in self.__slots__}
+        cols['quantity'] = [None if math.isnan(q) else q for q in self.quantity]
+        return cols
+
+    @classmethod
+    def from_columns(cls, cols: Dict[str, list]) -> "BomTable":
+        t = cls()
+        t.level.extend(cols['level'])
+        for name in ('part_number', 'part_name', 'note', 'change'):
+            getattr(t, name).extend(sys.intern(v) for v in cols[name])
+        t.quantity.extend(math.nan if q is None else q for q in cols['quantity'])
+        t.flags.extend(cols['flags'])
+        return t
 
-                pn = normalize_text(clean_cell(row[cmap['part_number']])) if cmap['part_number'] < len(row) else ""
-                dn = pn
-                raw_chg = clean_cell(row[cmap['change']]) if (cmap['change'] is not None and cmap['change'] < len(row)) else ""
-                nums = re.findall(r"\d+", raw_chg)
-                chg = nums[-1] if nums else "0"
+# ───────────── PDF PARSE ─────────────
+def _locate_header(tbl: List[List[Optional[str]]]) -> Tuple[int, Dict[str, Optional[int]], bool]:
+    """Find the header row of a page table and map column names to indexes.
+
+    Returns ``(row, column map, detected)``; ``detected`` is False when no
+    row looked like the header and row 2 was assumed.
+    """
+    # locate header row
+    hdr_i = next(
+        (
+            i for i, row in enumerate(tbl[:6])
+            if any(clean_cell(c).lower().startswith("level") for c in row)
+               and any(clean_cell(c).lower().startswith("part number") for c in row)
+        ),
+        None
+    )
+    detected = hdr_i is not None
+    if not detected:
+        hdr_i = 2
+    cmap = _map_columns(tbl[hdr_i])
+    for col, ci in COLUMN_FALLBACKS.items():
+        cmap.setdefault(col, ci)
+    return hdr_i, cmap, detected
+
+def _map_columns(hdr: List[Optional[str]]) -> Dict[str, Optional[int]]:
+    """Column indexes of the named columns found in header row ``hdr``."""
+    cmap: Dict[str, Optional[int]] = {}
+    for ci, cell in enumerate(hdr):
+        txt = clean_cell(cell).lower()
+        if "part number" in txt:
+            cmap['part_number'] = ci
+        elif "part name" in txt:
+            cmap['part_name'] = ci
+        elif "qty" in txt:
+            cmap['quantity'] = ci
+        elif "change" in txt or txt.startswith("rev"):
+            cmap['change'] = ci
+        elif "note" in txt or "備" in txt:  # 備考 NOTE
+            cmap['note'] = ci
+    return cmap
+
+def _fmt_word(w: str) -> str:
+    if any(ch.isdigit() for ch in w):
+        return w.upper()
+    if w.isupper() and len(w) <= CUT_THRESHOLD:
+        return w
+    return w.lower().capitalize()
+
+def _stitch_part_name(raw: str) -> Tuple[str, bool, bool]:
+    """Build the English part name from a raw part-name cell.
+
+    Returns ``(name, had_multiline_english, is_outline_drawing)``.
+    """
+    raw_lines_all = [ln.strip() for ln in raw.splitlines() if ln.strip()]
+    is_outline = "outline drawing" in " ".join(raw_lines_all).lower()
+
+    # Build EN content:
+    # Start from everything except the first line (often JP),
+    # then optionally drop the first EN candidate if it’s JP/too-short.
+    content = raw_lines_all[1:] if len(raw_lines_all) > 1 else raw_lines_all[:1]
+    if content:
+        cand = content[0]
+        eng = re.sub(r'[^A-Za-z]', '', cand)
+        if JAPANESE_RE.search(cand) or len(eng) < CUT_THRESHOLD:
+            content = content[1:]
+
+    # >>> Only flag multiline if we STILL have 2+ EN lines after filtering <<<
+    had_multiline_english = len(content) > 1
+
+    # flatten lines: default add space, join only if true mid-word split
+    flat = ""
+    for i, ln in enumerate(content):
+        ln = ln.strip()
+        if i == 0:
+            flat = ln
+        else:
+            if flat and flat[-1].isalpha() and ln and ln[0].isalpha() and not flat.endswith(" "):
+                flat += ln
+            else:
+                flat += " " + ln
 
-                qt = clean_cell(row[cmap['quantity']]) if (cmap['quantity'] is not None and cmap['quantity'] < len(row)) else ""
-                try:
-                    qty = int(qt) if qt else None
-                except ValueError:
-                    try:
-                        qty = float(qt)
-                    except ValueError:
-                        qty = None
-
-                note_used_as_display = bool(note)
-
-                entries.append({
-                    'level': level,
-                    'part_name': pname,                      # canonical parsed name (for Part Type)
-                    'display_name': (note or pname),         # visible "Part Name" cell
-                    'note': note,
-                    'note_norm': normalize_note(note),       # for merge logic
-                    'part_number': pn,
-                    'drawing_no': dn,
-                    'change': chg,
-                    'quantity': qty,
-                    'flag_multiline_en': had_multiline_english,  # << ONLY EN multiline
-                    'flag_note_used': note_used_as_display,      # << NOTE used
-                })
+    words = strip_non_ascii(flat).split()
+    return " ".join(_fmt_word(w) for w in words).strip(), had_multiline_english, is_outline
+
+def _parse_quantity(qt: str) -> Optional[float]:
+    try:
+        return int(qt) if qt else None
+    except ValueError:
+        try:
+            return float(qt)
+        except ValueError:
+            return None
+
+def _normalize_rows(rows: List[List[Optional[str]]], cmap: Dict[str, Optional[int]],
+                    deleted_idxs: Set[int], entries: BomTable, stats: Optional[Dict] = None) -> None:
+    """Turn a page's table rows into BOM entries, appended to ``entries``.
+
+    Rows without an item number, red-struck items, level-1 outline drawings
+    and rows without an English part name are skipped. ``stats``, if given,
+    receives the ``rows_deleted`` and ``outline_skipped`` counts.
+    """
+    def cell(row: List[Optional[str]], ci: Optional[int]) -> str:
+        return clean_cell(row[ci]) if ci is not None and ci < len(row) else ""
+
+    deleted = outlines = 0
+    for row in rows:
+        idx = clean_cell(row[0])
+        if not idx or not re.match(r"^\d+(?:\.\d+)?$", idx):
+            continue
+
+        # skip if flagged deleted
+        idx_int = parse_index_int(idx)
+        if idx_int is not None and idx_int in deleted_idxs:
+            deleted += 1
+            continue
+
+        # detect level (first non-empty among columns 1..5)
+        level = next((ci for ci in range(1, 6) if ci < len(row) and clean_cell(row[ci])), 1)
+
+        raw = row[cmap['part_name']] if cmap['part_name'] < len(row) else ""
+        pname, had_multiline_english, is_outline = _stitch_part_name(str(raw))
+        if not pname:
+            continue
+        if level == 1 and is_outline:
+            outlines += 1
+            continue
+
+        # NOTE (備考)
+        note = cell(row, cmap['note'])
+        if is_trivial_note(note):
+            note = ""
+
+        pn = normalize_text(cell(row, cmap['part_number']))
+        nums = re.findall(r"\d+", cell(row, cmap['change']))
+        chg = nums[-1] if nums else "0"
+        qty = _parse_quantity(cell(row, cmap['quantity']))
+
+        flags = FLAG_MULTILINE_EN if had_multiline_english else 0  # << ONLY EN multiline
+        if note:
+            flags |= FLAG_NOTE_USED                                   # << NOTE used as display name
+
+        # part_name is the canonical parsed name (for Part Type); the visible
+        # "Part Name" cell is note-or-name, see BomTable.display_name
+        entries.append(level, pn, pname, note, chg, qty, flags)
+
+    if stats is not None:
+        stats['rows_deleted'], stats['outline_skipped'] = deleted, outlines
+
+def _page_table_rows(page: "pdfplumber.page.Page", doc: Optional["BomDocument"]
+                     ) -> Optional[Tuple[List[List[Optional[str]]], Dict[str, Optional[int]], str]]:
+    """The page's BOM table rows below the header, their column map and how the
+    header was found (see :class:`PageMetricsLog`); None without a table."""
+    if doc is not None and doc.engine == 'words':
+        found = read_word_rows(page)
+        if found is not None:
+            return found[0], found[1], 'words'
+    rows = doc.template.read(page) if doc is not None and doc.template is not None else None
+    if rows is not None:
+        return rows, doc.template.cmap, 'template'
+    if doc is not None and doc.use_template:
+        tables = page.find_tables()
+        if not tables:
+            return None
+        tbl = tables[0].extract(x_tolerance=3, y_tolerance=3)
+        hdr_i, cmap, detected = _locate_header(tbl)
+        doc.template = TableTemplate.learn(page, tables[0], tbl, hdr_i, cmap)
+        logging.debug('%s p%d: table template %s', doc.path.name, page.page_number,
+                      'learned' if doc.template else 'not applicable')
+    else:
+        tbls = page.extract_tables()
+        if not tbls:
+            return None
+        tbl = tbls[0]
+        hdr_i, cmap, detected = _locate_header(tbl)
+    return tbl[hdr_i + 1:], cmap, 'detected' if detected else 'fallback'
+
+def parse_page_entries(page: "pdfplumber.page.Page", doc: Optional["BomDocument"] = None,
+                       out: Optional[BomTable] = None) -> BomTable:
+    """Parse the BOM rows of a single page, skipping red-struck items.
+
+    Rows are appended to ``out`` (a new :class:`BomTable` if not given),
+    which is returned.
+
+    If ``doc`` has table templates enabled, the page is read through the
+    document's :class:`TableTemplate`. Full table detection runs only when the
+    template does not fit, and that page then becomes the new template.
+    With ``doc.engine == 'words'`` the page is read by :func:`read_word_rows`
+    first, and by the table path only if that cannot read it.
+    With a :class:`PageMetricsLog` on ``doc``, one metrics record is written
+    for the page.
+    """
+    entries = BomTable() if out is None else out
+    metrics = doc.metrics if doc is not None else None
+    if metrics is None:
+        _parse_page(page, doc, entries)
+        return entries
+
+    stats: Dict = {
+        'pdf': doc.path.name, 'page': page.page_number, 'header': 'no_table',
+        'rows_seen': 0, 'rows_accepted': 0, 'rows_deleted': 0, 'outline_skipped': 0,
+    }
+    start, t0 = len(entries), time.perf_counter()
+    _parse_page(page, doc, entries, stats)
+    flags = entries.flags[start:]
+    stats['rows_accepted'] = len(flags)
+    stats['flag_multiline_en'] = sum(1 for f in flags if f & FLAG_MULTILINE_EN)
+    stats['flag_note_used'] = sum(1 for f in flags if f & FLAG_NOTE_USED)
+    stats['seconds'] = round(time.perf_counter() - t0, 6)
+    metrics.write(stats)
+    return entries
 
+def _parse_page(page: "pdfplumber.page.Page", doc: Optional["BomDocument"], entries: BomTable,
+                stats: Optional[Dict] = None) -> None:
+    """Body of :func:`parse_page_entries`; fills the parse side of ``stats``."""
+    with PROFILE.stage('get_deleted_indices'):
+        deleted_idxs = get_deleted_indices(page)
+    with PROFILE.stage('extract_tables'):
+        found = _page_table_rows(page, doc)
+    if found is None:
+        return
+    rows, cmap, header = found
+
+    rows = [row for row in rows if row]
+    if stats is not None:
+        stats['header'], stats['rows_seen'] = header, len(rows)
+    if not rows:
+        return
+    with PROFILE.stage('normalize_rows'):
+        _normalize_rows(rows, cmap, deleted_idxs, entries, stats)
+
+def _parse_page_chunk(pdf_path: str, page_idxs: List[int], template: bool = False,
+                      metrics: Optional[PageMetricsLog] = None, engine: str = 'tables') -> BomTable:
+    """Worker: open the PDF in this process and parse the given pages."""
+    table = BomTable()
+    with BomDocument(Path(pdf_path), use_template=template, metrics=metrics, engine=engine) as doc:
+        for page in doc.pages(page_idxs):
+            parse_page_entries(page, doc, table)
+    return table
+
+def _parse_pages_parallel(pdf_path: Path, n_pages: int, jobs: int, template: bool = False,
+                          metrics: Optional[PageMetricsLog] = None, engine: str = 'tables') -> BomTable:
+    """Parse contiguous page chunks in a process pool, stitched back in page order."""
+    size = max(1, -(-n_pages // (jobs * 4)))
+    chunks = [list(range(i, min(i + size, n_pages))) for i in range(0, n_pages, size)]
+    logging.debug('Parsing %s: %d pages in %d chunks on %d workers',
+                  pdf_path, n_pages, len(chunks), min(jobs, len(chunks)))
+    entries = BomTable()
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as ex:
+        for chunk in ex.map(_parse_page_chunk, [str(pdf_path)] * len(chunks), chunks,
+                            [template] * len(chunks), [metrics] * len(chunks), [engine] * len(chunks)):
+            entries.extend(chunk)
+    return entries
+
+def parse_bom_document(pdf_path: Path, jobs: int = 1, template: bool = False,
+                       metrics: Optional[PageMetricsLog] = None,
+                       engine: str = 'tables') -> Tuple[BomTable, str, str]:
+    """Parse entries and (customer, product) metadata in one pass over the PDF.
+
+    Each page is laid out once and serves the table parser, the deletion
+    detector and the metadata scan. With ``jobs > 1`` the pages go to a
+    process pool (see :func:`parse_bom_pdf`) and only the metadata is scanned
+    here, stopping at the first page that has it. ``template`` enables the
+    learned :class:`TableTemplate` fast path for table extraction and
+    ``engine='words'`` the :func:`read_word_rows` backend; ``metrics``
+    receives one record per page (see :class:`PageMetricsLog`).
+    """
+    with BomDocument(pdf_path, use_template=template, metrics=metrics, engine=engine) as doc:
+        if jobs > 1 and doc.page_count > 1:
+            entries = _parse_pages_parallel(pdf_path, doc.page_count, jobs, template, metrics, engine)
+            cust, prod = doc.scan_metadata()
+            return entries, cust, prod
+
+        entries = BomTable()
+        for page in doc.pages():
+            parse_page_entries(page, doc, entries)
+            doc.feed_metadata(page)
+        cust, prod = doc.metadata
+    return entries, cust, prod
+
+def iter_bom_entries(pdf_path: Path, template: bool = False,
+                     metrics: Optional[PageMetricsLog] = None, engine: str = 'tables') -> Iterator[Dict]:
+    """Yield the entries of a BOM PDF page by page.
+
+    Only one page is laid out at a time and its caches are flushed before the
+    next one, so memory stays flat however many pages the BOM has. Consumers
+    such as :func:`write_combined_excel` can take the generator directly.
+    """
+    with BomDocument(pdf_path, use_template=template, metrics=metrics, engine=engine) as doc:
+        for page in doc.pages():
+            yield from parse_page_entries(page, doc)
+
+def parse_bom_pdf(pdf_path: Path, jobs: int = 1, template: bool = False,
+                  metrics: Optional[PageMetricsLog] = None, engine: str = 'tables') -> BomTable:
+    """Parse every page of a BOM PDF.
+
+    With ``jobs > 1`` contiguous page chunks are parsed in a process pool;
+    results are stitched back in page order, so output matches the serial run.
+    ``metrics`` receives one record per page (see :class:`PageMetricsLog`).
+    """
+    if jobs > 1:
+        with BomDocument(pdf_path) as doc:
+            n_pages = doc.page_count
+        if n_pages > 1:
+            return _parse_pages_parallel(pdf_path, n_pages, jobs, template, metrics, engine)
+    entries = BomTable()
+    with BomDocument(pdf_path, use_template=template, metrics=metrics, engine=engine) as doc:
+        for page in doc.pages():
+            parse_page_entries(page, doc, entries)
     return entries
 
 # ───────────── METADATA ─────────────
-def parse_pdf_metadata(pdf_path: Path) -> Tuple[str, str]:
-    with pdfplumber.open(str(pdf_path)) as pdf:
-        full_text = "".join(page.extract_text() or "" for page in pdf.pages)
-    lines = [ln.strip() for ln in full_text.splitlines() if ln.strip()]
-    for i, line in enumerate(lines):
-        up = line.upper()
+def _find_metadata(lines: List[str], start: int = 0) -> Optional[Tuple[str, str]]:
+    """Look for the 'PRODUCT NUMBER … CUSTOMER' line in ``lines[start:]``.
+
+    Returns (customer, product) once the line is found ("" pair if the line
+    above it is unusable), or None if it has not been seen yet.
+    """
+    for i in range(start, len(lines)):
+        up = lines[i].upper()
         if up.startswith("PRODUCT NUMBER") and "CUSTOMER" in up:
             if i > 0:
                 parts = lines[i-1].split()
                 if len(parts) >= 2:
                     return strip_non_ascii(normalize_text(parts[1])), strip_non_ascii(normalize_text(parts[0]))
-            break
-    return "", ""
+            return "", ""
+    return None
 
-# ───────────── EXCEL WRITE ─────────────
-def write_combined_excel(sheets: List[Tuple[str, List[Dict], str, str]], out_path: Path) -> None:
-    parts: Dict[str, Dict] = {}
-    initial_order: List[str] = []
+def parse_pdf_metadata(pdf_path: Path) -> Tuple[str, str]:
+    with BomDocument(pdf_path) as doc:
+        return doc.scan_metadata()
+
+# ───────────── PARSE CACHE ─────────────
+PARSER_VERSION = 2  # bump whenever parse output changes for reasons not captured below
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'yc-sov'
+DEFAULT_CACHE_MB = 512
+
+def parser_fingerprint() -> str:
+    """Hash of every knob that changes what the parser produces for the same PDF."""
+    knobs = {
+        'version': PARSER_VERSION,
+        'cut_threshold': CUT_THRESHOLD,
+        'trivial_note': [_TRIVIAL_NOTE_REGEX.pattern, _TRIVIAL_NOTE_REGEX.flags],
+        'japanese': JAPANESE_RE.pattern,
+        'column_fallbacks': COLUMN_FALLBACKS,
+        'strike': [RED, GUTTER_X1, MARK_ABOVE, MARK_BELOW],
+    }
+    return hashlib.sha256(json.dumps(knobs, sort_keys=True).encode()).hexdigest()[:16]
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+class ParseCache:
+    """Parsed BOMs on disk, content-addressed by PDF bytes + parser fingerprint.
+
+    One JSON file per (PDF, parser) pair holding the entries as
+    :class:`BomTable` columns and the (customer, product) metadata. Reads bump the file's mtime and writes evict
+    the least recently used files once the directory exceeds ``max_bytes``.
+    ``rebuild`` ignores stored results but still writes fresh ones.
+    """
+
+    def __init__(self, root: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MB << 20,
+                 rebuild: bool = False):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.rebuild = rebuild
+        self._fingerprint = parser_fingerprint()
+
+    def key(self, pdf_path: Path) -> str:
+        return f"{file_sha256(pdf_path)}-{self._fingerprint}"
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Tuple[BomTable, str, str]]:
+        if self.rebuild:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            os.utime(path)
+            entries = BomTable.from_columns(data['columns'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        return entries, data['customer'], data['product']
+
+    def put(self, key: str, entries: BomTable, cust: str, prod: str) -> None:
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'customer': cust, 'product': prod, 'columns': entries.to_columns()}, f,
+                          ensure_ascii=False)
+            os.replace(tmp, self._path(key))
+        except OSError as exc:
+            logging.warning('Could not write parse cache %s: %s', self.root, exc)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        files = []
+        for p in self.root.glob('*.json'):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in files)
+        for _, size, p in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                total -= size
+                logging.debug('Evicted %s from parse cache', p.name)
+            except OSError:
+                pass
+
+# ───────────── BOM DATABASE ─────────────
+# Variants can come from the SQLite database convert.py fills instead of a PDF:
+# give ``db:PRODUCT`` as the source (-s VAR db:66401-080A).
+DB_SOURCE = 'db:'
+DEFAULT_BOM_DB = Path('yazaki_bom.db')
+# a stored line is laid out as a table row: item, level 1-5, part number, change, part name, qty, note
+DB_COLUMNS: Dict[str, Optional[int]] = {'part_number': 6, 'change': 7, 'part_name': 8, 'quantity': 9, 'note': 10}
+
+def db_product(src: Union[str, Path]) -> Optional[str]:
+    """The product number of a ``db:PRODUCT`` source; None for a PDF."""
+    src = str(src)
+    return src[len(DB_SOURCE):].strip() if src.startswith(DB_SOURCE) else None
+
+def open_bom_db(db_path: Path) -> sqlite3.Connection:
+    """Open a convert.py database read-only."""
+    if not Path(db_path).is_file():
+        raise FileNotFoundError(f'BOM database not found: {db_path}')
+    conn = sqlite3.connect(f'{Path(db_path).resolve().as_uri()}?mode=ro', uri=True)
+    have = {r[1] for r in conn.execute("PRAGMA table_info(bom_lines)")}
+    if not {'name_raw', 'struck'} <= have:
+        conn.close()
+        raise sqlite3.DatabaseError(f'{db_path} predates the current schema; run convert.py on it first')
+    return conn
+
+def read_db_bom(conn: sqlite3.Connection, product: str) -> Tuple[BomTable, str, str]:
+    """Entries and (customer, product) of ``product`` as stored by convert.py.
+
+    Red-struck lines are left out, and the other lines go through
+    :func:`_normalize_rows` like the rows of a parsed page, so a stored BOM
+    yields the entries its PDF would. Lines stored before convert.py kept the
+    raw part-name cell fall back to its English-only part name.
+    """
+    found = conn.execute("SELECT product_id, product_number, customer_part_number FROM products "
+                         "WHERE product_number = ?", (normalize_text(product),)).fetchone()
+    if found is None:
+        raise LookupError(f'product {product} is not in the BOM database')
+    product_id, prod, cust = found
+    lines = conn.execute("""
+        SELECT l.item_no, l.level, pa.part_number, l.change, l.name_raw, pa.part_name, l.quantity, pa.note
+        FROM bom_lines l JOIN parts pa ON pa.part_id = l.part_id
+        WHERE l.product_id = ? AND NOT l.struck
+        ORDER BY l.line_id
+    """, (product_id,)).fetchall()
+
+    rows: List[List[Optional[str]]] = []
+    old = 0
+    for item, level, pn, chg, raw, name, qty, note in lines:
+        levels = [str(level) if level == n else "" for n in range(1, 6)]
+        old += raw is None
+        rows.append([item, *levels, pn, chg or "", name if raw is None else raw,
+                     "" if qty is None else repr(qty), note or ""])
+    if old:
+        logging.warning('Product %s: %d line(s) stored without the raw part-name cell; '
+                        're-load the PDF with convert.py for exact part names', prod, old)
+    entries = BomTable()
+    if rows:
+        _normalize_rows(rows, DB_COLUMNS, set(), entries)
+    return entries, strip_non_ascii(normalize_text(cust or "")), strip_non_ascii(normalize_text(prod))
+
+# ───────────── VARIANT INGESTION ─────────────
+Sheet = Tuple[str, BomTable, str, str]  # (variant, entries, customer no., product no.)
+
+def _ingest_pdf(pdf_path: str, jobs: int = 1, template: bool = False,
+                metrics: Optional[PageMetricsLog] = None,
+                engine: str = 'tables') -> Tuple[Tuple[BomTable, str, str], float]:
+    """Worker: parse one variant PDF into ((entries, customer, product), seconds)."""
+    t0 = time.perf_counter()
+    res = parse_bom_document(Path(pdf_path), jobs=jobs, template=template, metrics=metrics, engine=engine)
+    return res, time.perf_counter() - t0
+
+def ingest_variants(specs: List[Tuple[str, Path]], jobs: int = 1, cache: Optional[ParseCache] = None,
+                    template: bool = False, timings: Optional[Dict[int, float]] = None,
+                    metrics: Optional[PageMetricsLog] = None, engine: str = 'tables',
+                    bom_db: Path = DEFAULT_BOM_DB
+                    ) -> Tuple[List[Sheet], List[Tuple[str, Path, BaseException]]]:
+    """Parse all variant PDFs, concurrently when ``jobs > 1``.
+
+    Returns ``(sheets, failures)``, both in the order of ``specs`` (the ``-s``
+    order). A failing PDF is logged and reported in ``failures``; it does not
+    stop the other variants from being parsed. PDFs found in ``cache`` are
+    loaded from it without opening them; fresh results are stored back.
+    ``timings``, if given, receives the parse seconds per ``specs`` index;
+    ``metrics`` receives a record per parsed page (cache hits have none).
+    ``db:PRODUCT`` sources are read from the ``bom_db`` database.
+    """
+    results: List[Optional[Tuple[BomTable, str, str]]] = [None] * len(specs)
+    errors: List[Optional[BaseException]] = [None] * len(specs)
+    keys: Dict[int, str] = {}
+
+    def _done(i: int, res: Optional[Tuple[BomTable, str, str]], exc: Optional[BaseException],
+              cached: bool = False, seconds: float = 0.0) -> None:
+        var, pdf = specs[i]
+        if exc is not None:
+            errors[i] = exc
+            logging.error('Variant %s: failed to parse %s: %s', var, pdf, exc)
+            return
+        results[i] = res
+        if timings is not None:
+            timings[i] = seconds
+        logging.info('Variant %s: %d entries from %s%s', var, len(res[0]), pdf, ' (cached)' if cached else '')
+        if cache is not None and not cached and i in keys:
+            cache.put(keys[i], *res)
+
+    todo: List[int] = []
+    from_db = [i for i, (_, src) in enumerate(specs) if db_product(src) is not None]
+    if from_db:
+        try:
+            conn = open_bom_db(bom_db)
+        except (OSError, sqlite3.Error) as exc:
+            for i in from_db:
+                _done(i, None, exc)
+        else:
+            with PROFILE.stage('read_db'):
+                for i in from_db:
+                    t0 = time.perf_counter()
+                    try:
+                        res = read_db_bom(conn, db_product(specs[i][1]))
+                    except (LookupError, sqlite3.Error) as exc:
+                        _done(i, None, exc)
+                    else:
+                        _done(i, res, None, seconds=time.perf_counter() - t0)
+            conn.close()
+    for i, (_, pdf) in enumerate(specs):
+        if i in from_db:
+            continue
+        if not pdf.is_file():
+            _done(i, None, FileNotFoundError(f'PDF not found: {pdf}'))
+            continue
+        if cache is not None:
+            try:
+                keys[i] = cache.key(pdf)
+            except OSError as exc:
+                _done(i, None, exc)
+                continue
+            hit = cache.get(keys[i])
+            if hit is not None:
+                _done(i, hit, None, cached=True)
+                continue
+        todo.append(i)
+
+    if jobs > 1 and len(todo) > 1:
+        # one process per variant, largest PDF first so no big one is left running
+        # alone at the end; page-level parallelism is only used for a single PDF
+        todo.sort(key=lambda i: specs[i][1].stat().st_size, reverse=True)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as ex:
+            futs = {ex.submit(_ingest_pdf, str(specs[i][1]), 1, template, metrics, engine): i for i in todo}
+            for fut in as_completed(futs):
+                exc = fut.exception()
+                if exc is not None:
+                    _done(futs[fut], None, exc)
+                else:
+                    res, seconds = fut.result()
+                    _done(futs[fut], res, None, seconds=seconds)
+    else:
+        for i in todo:
+            pdf = specs[i][1]
+            try:
+                res, seconds = _ingest_pdf(str(pdf), jobs=jobs, template=template, metrics=metrics,
+                                           engine=engine)
+            except Exception as exc:
+                _done(i, None, exc)
+            else:
+                _done(i, res, None, seconds=seconds)
 
-    def make_key(r: Dict, vi: int, seq: int) -> str:
-        if r['level'] == 1:
-            nn = r.get('note_norm', "")
-            return f"{r['part_number']}@@n={nn}"
-        return f"{r['part_number']}@@v{vi}@@i{seq}"
+    sheets: List[Sheet] = []
+    failures: List[Tuple[str, Path, BaseException]] = []
+    for (var, pdf), res, exc in zip(specs, results, errors):
+        if exc is not None:
+            failures.append((var, pdf, exc))
+        else:
+            ents, cust, prod = res
+            sheets.append((var, ents, cust, prod))
+    return sheets, failures
+
+# ───────────── BUILD STATE ─────────────
+class BuildState:
+    """Per-variant entries and PDF fingerprints of one SOV build.
+
+    Saved as ``<output>.state.json`` next to the workbook, so a later
+    ``--incremental`` run only re-parses the variants whose PDF changed (or
+    that are new) and re-merges everything else from here. A PDF at the same
+    path whose size and mtime are unchanged is trusted without hashing it;
+    otherwise its SHA-256 decides. A state written by a different parser is ignored.
+    """
+    VERSION = 1
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.variants: Dict[str, Dict] = {}  # variant -> pdf, fingerprint, metadata, entry columns
+
+    @classmethod
+    def for_output(cls, out_path: Path) -> "BuildState":
+        return cls(out_path.with_name(out_path.name + '.state.json'))
+
+    def load(self) -> "BuildState":
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if data.get('version') != self.VERSION or data.get('parser') != parser_fingerprint():
+            logging.info('Ignoring %s: written by a different parser version', self.path)
+            return self
+        self.variants = data.get('variants', {})
+        return self
+
+    def lookup(self, var: str, pdf: Path) -> Optional[Tuple[BomTable, str, str]]:
+        """The stored result for ``var`` if ``pdf`` is still the PDF it was parsed from."""
+        rec = self.variants.get(var)
+        if rec is None:
+            return None
+        try:
+            st = pdf.stat()
+            # size and mtime only vouch for the file they were taken from; a copy
+            # elsewhere (cp -p, an unpacked archive) can share them
+            if (str(pdf), st.st_size, st.st_mtime_ns) != (rec['pdf'], rec['size'], rec['mtime_ns']):
+                if file_sha256(pdf) != rec['sha256']:
+                    return None
+                rec['pdf'], rec['size'], rec['mtime_ns'] = str(pdf), st.st_size, st.st_mtime_ns
+            return BomTable.from_columns(rec['columns']), rec['customer'], rec['product']
+        except (OSError, KeyError, TypeError, ValueError):
+            return None
+
+    def record(self, var: str, pdf: Path, entries: BomTable, cust: str, prod: str) -> None:
+        st = pdf.stat()
+        self.variants[var] = {
+            'pdf': str(pdf), 'sha256': file_sha256(pdf), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+            'customer': cust, 'product': prod, 'columns': entries.to_columns(),
+        }
+
+    def save(self, variants: Iterable[str]) -> None:
+        """Write the state for ``variants``, dropping any others."""
+        keep = {var: self.variants[var] for var in variants if var in self.variants}
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'version': self.VERSION, 'parser': parser_fingerprint(), 'variants': keep}, f,
+                          ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logging.warning('Could not write build state %s: %s', self.path, exc)
+
+def ingest_incremental(specs: List[Tuple[str, Path]], state: BuildState, jobs: int = 1,
+                       cache: Optional[ParseCache] = None, template: bool = False,
+                       metrics: Optional[PageMetricsLog] = None, engine: str = 'tables',
+                       bom_db: Path = DEFAULT_BOM_DB) -> Tuple[List[Sheet], List[Tuple[str, Path, BaseException]]]:
+    """:func:`ingest_variants`, reusing every variant ``state`` still holds.
+
+    Freshly parsed variants are recorded into ``state``; saving it is left to
+    the caller, once the output is written. ``db:PRODUCT`` variants are
+    always read from the database, which is as cheap as the state.
+    """
+    stored = [None if db_product(pdf) is not None else state.lookup(var, pdf) for var, pdf in specs]
+    todo = [spec for spec, hit in zip(specs, stored) if hit is None]
+    logging.info('Incremental build: %d of %d variant(s) unchanged', len(specs) - len(todo), len(specs))
+    fresh, failures = ingest_variants(todo, jobs=jobs, cache=cache, template=template, metrics=metrics,
+                                      engine=engine, bom_db=bom_db)
+    fresh_by_var = {var: (ents, cust, prod) for var, ents, cust, prod in fresh}
+    for var, pdf in todo:
+        if var in fresh_by_var and db_product(pdf) is None:
+            state.record(var, pdf, *fresh_by_var[var])
+
+    sheets: List[Sheet] = []
+    for (var, _), hit in zip(specs, stored):
+        res = hit if hit is not None else fresh_by_var.get(var)
+        if res is not None:
+            sheets.append((var, *res))
+    return sheets, failures
+
+# ───────────── VARIANT MERGE ─────────────
+class MergedVariants(NamedTuple):
+    """Output of :func:`merge_variants`; all the Combined sheet renders."""
+    variants: List[Tuple[str, str, str]]  # (variant, customer no., product no.) per quantity column
+    rows: BomTable                        # merged rows, in first-seen order
+    order: List[int]                      # display order, as indexes into ``rows``
+    quantities: List[array]               # one column per variant over ``rows``, NaN = blank
+
+def merge_variants(sheets: List[Tuple[str, Union[BomTable, Iterable[Dict]], str, str]]) -> MergedVariants:
+    """Merge the variants' entries into one set of rows with a quantity per variant.
+
+    Level-1 parts merge on (part number, normalized note); all other rows stay
+    distinct. Rows are then grouped by the part name of the level-1 row that
+    opens their segment, groups in first-seen order. Entries are normally
+    :class:`BomTable` objects; any other iterable of entry dicts (e.g.
+    :func:`iter_bom_entries`) is consumed once into one. Runs in linear time.
+    """
+    lap = PROFILE.laps()
+    tables = [t if isinstance(t, BomTable) else BomTable.from_records(t) for _, t, _, _ in sheets]
+    merged = BomTable()
+    rows: Dict[Tuple, int] = {}          # merge key -> merged row, in first-seen order
+    qtys: List[array] = [array('d') for _ in tables]
 
-    # build parts dict
     seq_counter = 0
-    for vi, (_, ents, _, _) in enumerate(sheets):
-        for r in ents:
-            key = make_key(r, vi, seq_counter)
+    for vi, t in enumerate(tables):
+        for i in range(len(t)):
+            if t.level[i] == 1:
+                key = (t.part_number[i], normalize_note(t.note[i]))
+            else:
+                key = (t.part_number[i], vi, seq_counter)
             seq_counter += 1
 
-            if key not in parts:
-                parts[key] = {**r, 'qtys': [None] * len(sheets)}
-
-            existing = parts[key]['qtys'][vi]
-            q_add = r['quantity']
-            if q_add is not None:
-                new_total = (existing or 0) + q_add
-                parts[key]['qtys'][vi] = None if new_total == 0 else new_total
-
-            if key not in initial_order:
-                initial_order.append(key)
-
-    # segment into level-1 clusters
-    segments: List[List[str]] = []
-    current: List[str] = []
-    for key in initial_order:
-        if parts[key]['level'] == 1:
-            if current:
-                segments.append(current)
-            current = [key]
-        else:
-            current.append(key)
-    if current:
-        segments.append(current)
-
-    # group segments by their level-1 canonical part_name (not display_name)
-    seg_by_name: Dict[str, List[List[str]]] = {}
-    name_order: List[str] = []
-    for seg in segments:
-        name = parts[seg[0]]['part_name']
-        if name not in seg_by_name:
-            seg_by_name[name] = []
-            name_order.append(name)
-        seg_by_name[name].append(seg)
-
-    # final order
-    ordered_keys: List[str] = []
-    for name in name_order:
-        for seg in seg_by_name[name]:
-            ordered_keys.extend(seg)
+            j = rows.get(key)
+            if j is None:
+                j = rows[key] = merged.append_row(t, i)
+                for col in qtys:
+                    col.append(math.nan)
+
+            q_add = t.quantity[i]
+            if not math.isnan(q_add):
+                existing = qtys[vi][j]
+                new_total = (0 if math.isnan(existing) else existing) + q_add
+                qtys[vi][j] = math.nan if new_total == 0 else new_total
+
+    # level-1 segments, grouped by their canonical part_name (not display_name)
+    groups: Dict[str, List[int]] = {}
+    group: Optional[List[int]] = None
+    for j in range(len(merged)):
+        if group is None or merged.level[j] == 1:
+            group = groups.setdefault(merged.part_name[j], [])
+        group.append(j)
+
+    order = [j for g in groups.values() for j in g]
+    lap('merge')
+    return MergedVariants([(var, cust, prod) for var, _, cust, prod in sheets], merged, order, qtys)
+
+# ───────────── EXCEL WRITE ─────────────
+def _add_merge(ws, first_row: int, first_col: int, last_row: int, last_col: int) -> None:
+    """Record a merged range whose cells the caller writes itself, row by row.
+
+    ``merge_range()`` writes the whole block at once; for a range spanning
+    several rows that would move xlsxwriter's constant_memory cursor past rows
+    whose other cells are still to come, and those cells would be dropped.
+    """
+    ws.merge.append([first_row, first_col, last_row, last_col])
+
+class FormatPool:
+    """The formats of one workbook, keyed by their properties.
+
+    Sheets ask the pool instead of calling ``add_format`` themselves, so a batch
+    workbook holds each distinct format once however many sheets it has.
+    """
+
+    def __init__(self, wb):
+        self.wb = wb
+        self._formats: Dict[Tuple, object] = {}
+
+    def get(self, props: Dict):
+        key = tuple(sorted(props.items()))
+        fmt = self._formats.get(key)
+        if fmt is None:
+            fmt = self._formats[key] = self.wb.add_format(props)
+        return fmt
+
+def _open_workbook(out_path: Path, constant_memory: bool = False) -> "xlsxwriter.Workbook":
+    import xlsxwriter
+
+    return xlsxwriter.Workbook(str(out_path), {'constant_memory': True} if constant_memory else {})
+
+def _render_combined(result: MergedVariants, out_path: Path, constant_memory: bool = False) -> None:
+    """Render a :func:`merge_variants` result as the Combined sheet of a new workbook."""
+    wb = _open_workbook(out_path, constant_memory)
+    _render_sheet(FormatPool(wb), 'Combined', result)
+    with PROFILE.stage('workbook_close'):
+        wb.close()
+    logging.info('Written Combined → %s', out_path)
+
+def _render_sheet(pool: FormatPool, name: str, result: MergedVariants) -> None:
+    """Render a :func:`merge_variants` result as sheet ``name`` of the pool's workbook.
+
+    Every cell is written in row order, so with ``constant_memory`` xlsxwriter
+    streams each finished row to disk and memory stays flat however many rows
+    and variant columns the SOV has.
+    """
+    lap = PROFILE.laps()
+    variants, merged, ordered, qtys = result
 
     # column positions
-    max_lvl = max(parts[k]['level'] for k in ordered_keys) if ordered_keys else 1
+    max_lvl = max(merged.level) if ordered else 1
     PN_COL = max_lvl
     GROUP_ST = PN_COL + 1
     QTY_ST = GROUP_ST + 3
 
-    writer = pd.ExcelWriter(str(out_path), engine='xlsxwriter')
-    wb = writer.book
-    ws = wb.add_worksheet('Combined')
+    ws = pool.wb.add_worksheet(name)
 
     # formats
     base = {'font_name': 'Arial', 'font_size': 12, 'border': 1, 'text_wrap': True}
-    merge_fmt = wb.add_format({**base, 'align': 'center', 'valign': 'vcenter'})
-    title_fmt = wb.add_format({'font_name': 'Arial', 'font_size': 26, 'align': 'center', 'valign': 'vcenter'})
-    rev_fmt = wb.add_format({**base, 'font_name': 'Symbol', 'align': 'center', 'valign': 'vcenter'})
-    vert_fmt = wb.add_format({**base, 'rotation': 90, 'align': 'center', 'valign': 'vcenter'})
-    left_fmt = wb.add_format({**base, 'align': 'left', 'valign': 'vcenter'})
-    blank_fmt = wb.add_format({**base, 'border': 0, 'bg_color': '#FFFFFF', 'align': 'center', 'valign': 'vcenter'})
-    grey_fmt = wb.add_format({'bg_color': '#A6A6A6', 'border': 0})
+    merge_fmt = pool.get({**base, 'align': 'center', 'valign': 'vcenter'})
+    title_fmt = pool.get({'font_name': 'Arial', 'font_size': 26, 'align': 'center', 'valign': 'vcenter'})
+    rev_fmt = pool.get({**base, 'font_name': 'Symbol', 'align': 'center', 'valign': 'vcenter'})
+    vert_fmt = pool.get({**base, 'rotation': 90, 'align': 'center', 'valign': 'vcenter'})
+    left_fmt = pool.get({**base, 'align': 'left', 'valign': 'vcenter'})
+    blank_fmt = pool.get({**base, 'border': 0, 'bg_color': '#FFFFFF', 'align': 'center', 'valign': 'vcenter'})
+    grey_fmt = pool.get({'bg_color': '#A6A6A6', 'border': 0})
 
     # highlight formats
-    hl_multiline_center = wb.add_format({**base, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#FFF2CC', 'pattern': 1})
-    hl_multiline_left   = wb.add_format({**base, 'align': 'left',   'valign': 'vcenter', 'bg_color': '#FFF2CC', 'pattern': 1})
-    hl_note_fmt         = wb.add_format({**base, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#F4CCCC', 'pattern': 1})
-    hl_both_fmt         = wb.add_format({**base, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#D9D2E9', 'pattern': 1})
-
-    # prefill canvas
-    GRID_ROWS = 500
-    GRID_COLS = 50
-    for rr in range(GRID_ROWS):
-        for cc in range(GRID_COLS):
-            ws.write_blank(rr, cc, None, grey_fmt)
-
-    # set row heights & core column widths
+    hl_multiline_center = pool.get({**base, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#FFF2CC', 'pattern': 1})
+    hl_multiline_left   = pool.get({**base, 'align': 'left',   'valign': 'vcenter', 'bg_color': '#FFF2CC', 'pattern': 1})
+    hl_note_fmt         = pool.get({**base, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#F4CCCC', 'pattern': 1})
+    hl_both_fmt         = pool.get({**base, 'align': 'center', 'valign': 'vcenter', 'bg_color': '#D9D2E9', 'pattern': 1})
+
+    # grey canvas: a column default format, so only real cells are written and
+    # the background covers every row; cells written below override it
+    last_col = max(CANVAS_COLS, QTY_ST + len(variants)) - 1
+    ws.set_column(0, last_col, None, grey_fmt)
+
+    # row heights & core column widths (keeping the canvas format)
     for i, h in enumerate(BLANK_HEIGHTS):
         ws.set_row(i, h)
     lvl_ws = [SMALL_WIDTH] * (max_lvl - 1) + [TOTAL_WIDTH - SMALL_WIDTH * (max_lvl - 1)]
     for i, w in enumerate(lvl_ws):
-        ws.set_column(i, i, w)
-    ws.set_column(PN_COL, PN_COL, PART_NAME_W)
+        ws.set_column(i, i, w, grey_fmt)
+    ws.set_column(PN_COL, PN_COL, PART_NAME_W, grey_fmt)
     for j, w in enumerate(BLANK_WIDTHS[3:6]):
-        ws.set_column(GROUP_ST + j, GROUP_ST + j, w)
+        ws.set_column(GROUP_ST + j, GROUP_ST + j, w, grey_fmt)
 
     # each variant quantity column width
-    for vi in range(len(sheets)):
-        ws.set_column(QTY_ST + vi, QTY_ST + vi, 13.91)
-
-    # title block
-    ws.merge_range(0, 0, START_ROW - 1, PN_COL, 'Spreadsheet of Variants', title_fmt)
-
-    # merged/bordered boxes rows 1–9
-    for r in range(0, 9):
-        if len(sheets) > 1:
-            ws.merge_range(r, QTY_ST, r, QTY_ST + len(sheets) - 1, '', merge_fmt)
-        else:
-            ws.write(r, QTY_ST, '', merge_fmt)
+    if variants:
+        ws.set_column(QTY_ST, QTY_ST + len(variants) - 1, 13.91, grey_fmt)
 
-    # vertical boxes rows 10–14
-    for r in range(9, START_ROW):
-        for vi in range(len(sheets)):
-            ws.write(r, QTY_ST + vi, "", vert_fmt)
-
-    # labels rows 1–14
+    # header block, rows 1–14, written strictly row by row (see _add_merge)
     labels = [
         'Yazaki Assy Drawing Number', 'Yazaki Assy Drawing Rev',
         'Yazaki MTS Part Number', 'Yazaki MTS Rev',
@@ -420,49 +1456,65 @@ def write_combined_excel(sheets: List[Tuple[str, List[Dict], str, str]], out_pat
         'Model Year', 'Manufacturing Plant',
         'Customer Part Number', 'Yazaki Assembly Number'
     ]
-    for i, txt in enumerate(labels):
-        ws.merge_range(i, GROUP_ST, i, GROUP_ST + 2, txt, merge_fmt)
-
-    # metadata
-    for vi, (_, _, cust, prod) in enumerate(sheets):
-        ws.write(12, QTY_ST + vi, cust, vert_fmt)
-        ws.write(13, QTY_ST + vi, prod, vert_fmt)
+    _add_merge(ws, 0, 0, START_ROW - 1, PN_COL)
+    for r in range(START_ROW):
+        # title block
+        for c in range(PN_COL + 1):
+            ws.write(r, c, 'Spreadsheet of Variants' if r == c == 0 else '', title_fmt)
+
+        # labels
+        ws.merge_range(r, GROUP_ST, r, GROUP_ST + 2, labels[r], merge_fmt)
+
+        if r < 9:
+            # merged/bordered boxes rows 1–9
+            if len(variants) > 1:
+                ws.merge_range(r, QTY_ST, r, QTY_ST + len(variants) - 1, '', merge_fmt)
+            else:
+                ws.write(r, QTY_ST, '', merge_fmt)
+        else:
+            # vertical boxes rows 10–14, customer / product number in the last two
+            for vi, (_, cust, prod) in enumerate(variants):
+                ws.write(r, QTY_ST + vi, cust if r == 12 else prod if r == 13 else '', vert_fmt)
 
     # header row 15
+    ws.set_row(START_ROW, DATA_ROW_H)
     ws.merge_range(START_ROW, 0, START_ROW, PN_COL - 1, 'Part Type', merge_fmt)
     ws.write(START_ROW, PN_COL, 'Part Name', merge_fmt)
     ws.write(START_ROW, GROUP_ST, 'Part Number', merge_fmt)
     ws.write(START_ROW, GROUP_ST + 1, 'Drawing Number', merge_fmt)
     ws.write(START_ROW, GROUP_ST + 2, 'Rev.', merge_fmt)
-    for vi in range(len(sheets)):
+    for vi in range(len(variants)):
         ws.write(START_ROW, QTY_ST + vi, '', merge_fmt)
 
+    lap('prefill')  # canvas, widths/heights and header block
+
     # data rows
-    for idx, key in enumerate(ordered_keys):
+    for idx, j in enumerate(ordered):
         r = START_ROW + 1 + idx
-        rec = parts[key]
-        sc = rec['level'] - 1
+        ws.set_row(r, DATA_ROW_H)
+        level = merged.level[j]
+        flag_multiline = bool(merged.flags[j] & FLAG_MULTILINE_EN)
+        flag_note_used = bool(merged.flags[j] & FLAG_NOTE_USED)
+        sc = level - 1
         if sc > 0:
             for c in range(sc):
                 ws.write(r, c, '', blank_fmt)
         ec = PN_COL - 1
 
         # choose Part Type format (highlight if multiline-EN)
-        pt_fmt = hl_multiline_left if rec.get('flag_multiline_en') and rec['level'] > 1 else (
-                 hl_multiline_center if rec.get('flag_multiline_en') else
-                 (merge_fmt if rec['level'] == 1 else left_fmt)
+        pt_fmt = hl_multiline_left if flag_multiline and level > 1 else (
+                 hl_multiline_center if flag_multiline else
+                 (merge_fmt if level == 1 else left_fmt)
         )
 
         # Part Type area = canonical part_name (NOT the note)
         if sc < ec:
-            ws.merge_range(r, sc, r, ec, rec['part_name'], pt_fmt)
+            ws.merge_range(r, sc, r, ec, merged.part_name[j], pt_fmt)
         else:
-            ws.write(r, sc, rec['part_name'], pt_fmt)
+            ws.write(r, sc, merged.part_name[j], pt_fmt)
 
         # Part Name column = note-or-name + HIGHLIGHTS
-        visible_name = rec.get('display_name') or rec['part_name']
-        flag_multiline = bool(rec.get('flag_multiline_en'))
-        flag_note_used = bool(rec.get('flag_note_used'))
+        visible_name = merged.display_name(j)
 
         if flag_multiline and flag_note_used:
             pn_fmt = hl_both_fmt
@@ -475,60 +1527,383 @@ def write_combined_excel(sheets: List[Tuple[str, List[Dict], str, str]], out_pat
 
         ws.write(r, PN_COL, visible_name, pn_fmt)
 
-        ws.write(r, GROUP_ST, rec['part_number'], merge_fmt)
-        ws.write(r, GROUP_ST + 1, rec['part_number'], merge_fmt)
-        ws.write(r, GROUP_ST + 2, f"D{rec['change']}", rev_fmt)
+        ws.write(r, GROUP_ST, merged.part_number[j], merge_fmt)
+        ws.write(r, GROUP_ST + 1, merged.part_number[j], merge_fmt)
+        ws.write(r, GROUP_ST + 2, f"D{merged.change[j]}", rev_fmt)
 
-        # quantities: blank for None or 0
-        for vi, q in enumerate(rec['qtys']):
+        # quantities: blank for none or 0
+        for vi, col_q in enumerate(qtys):
             col = QTY_ST + vi
-            if q is None or q == 0:
+            q = col_q[j]
+            if math.isnan(q) or q == 0:
                 ws.write(r, col, "", merge_fmt)
             else:
-                try:
-                    ws.write_number(r, col, float(q), merge_fmt)
-                except Exception:
-                    ws.write(r, col, str(q), merge_fmt)
-
-    last_r = START_ROW + len(ordered_keys)
-    for rr in range(START_ROW, last_r + 1):
-        ws.set_row(rr, 32.3)
-
-    writer.close()
-    logging.info('Written Combined → %s', out_path)
+                ws.write_number(r, col, q, merge_fmt)
+    lap('data_write')
+
+def write_combined_excel(sheets: List[Tuple[str, Union[BomTable, Iterable[Dict]], str, str]],
+                         out_path: Path, constant_memory: bool = False) -> None:
+    """Merge the variants' entries and render the Combined sheet.
+
+    See :func:`merge_variants`; ``constant_memory`` streams the workbook to
+    disk row by row.
+    """
+    _render_combined(merge_variants(sheets), out_path, constant_memory)
+
+# ───────────── BATCH ─────────────
+Program = Tuple[str, List[Tuple[str, Path]]]  # (program name, [(variant, PDF)])
+
+def _sheet_name(program: str, used: Set[str]) -> str:
+    """Excel-safe, workbook-unique sheet name for ``program``."""
+    base = re.sub(r'[\[\]:*?/\\]', '_', program).strip("'") or 'Combined'
+    name, n = base[:31], 1
+    while name.lower() in used:
+        n += 1
+        suffix = f' ({n})'
+        name = base[:31 - len(suffix)] + suffix
+    used.add(name.lower())
+    return name
+
+def ingest_programs(programs: List[Program], jobs: int = 1, cache: Optional[ParseCache] = None,
+                    template: bool = False,
+                    failures: Optional[List[Tuple[str, str, Path, BaseException]]] = None,
+                    metrics: Optional[PageMetricsLog] = None, engine: str = 'tables',
+                    bom_db: Path = DEFAULT_BOM_DB) -> Iterator[Tuple[str, MergedVariants]]:
+    """Parse and merge each program in turn, yielding ``(program, merged)``.
+
+    Programs are handled one at a time so only one program's entries are held
+    at once. Failed variants are appended to ``failures`` as ``(program,
+    variant, pdf, error)``; a program with no parsable variant is skipped.
+    """
+    for program, specs in programs:
+        sheets, failed = ingest_variants(specs, jobs=jobs, cache=cache, template=template, metrics=metrics,
+                                         engine=engine, bom_db=bom_db)
+        if failures is not None:
+            failures.extend((program, var, pdf, exc) for var, pdf, exc in failed)
+        if not sheets:
+            logging.error('Program %s: no variant could be parsed', program)
+            continue
+        if failed:
+            logging.warning('Program %s: writing without failed variant(s): %s',
+                            program, ', '.join(var for var, _, _ in failed))
+        yield program, merge_variants(sheets)
+
+def write_batch_excel(programs: Iterable[Tuple[str, MergedVariants]], out_path: Path,
+                      separate: bool = False, constant_memory: bool = False) -> List[Path]:
+    """Write many SOVs: one sheet per program in the workbook ``out_path``.
+
+    All sheets share one :class:`FormatPool` and xlsxwriter's shared string
+    table (unless ``constant_memory``, which writes strings inline). With
+    ``separate``, ``out_path`` is a folder that gets one ``<program>.xlsx``
+    per program instead. Returns the files written.
+    """
+    if separate:
+        out_path.mkdir(parents=True, exist_ok=True)
+        written = []
+        for program, result in programs:
+            stem = re.sub(r'[\\/:*?"<>|]', '_', program)
+            path = out_path / f'{stem}.xlsx'
+            _render_combined(result, path, constant_memory)
+            written.append(path)
+        return written
+
+    # the workbook is opened with the first program: xlsxwriter writes the file
+    # when a workbook is closed or collected, so an unused one would still
+    # replace out_path with an empty workbook
+    wb = pool = None
+    used: Set[str] = set()
+    for program, result in programs:
+        if wb is None:
+            wb = _open_workbook(out_path, constant_memory)
+            pool = FormatPool(wb)
+        _render_sheet(pool, _sheet_name(program, used), result)
+        logging.info('Program %s: %d rows', program, len(result.order))
+    if wb is None:
+        logging.error('No program could be parsed; %s not written', out_path)
+        return []
+    with PROFILE.stage('workbook_close'):
+        wb.close()
+    logging.info('Written %d program sheet(s) → %s', len(used), out_path)
+    return [out_path]
+
+def load_manifest(path: Path, out_dir: Optional[Path] = None) -> List[Program]:
+    """Read a batch manifest: the outputs to build and each one's variant PDFs.
+
+    CSV: one row per variant with ``output``, ``variant`` and ``pdf`` columns;
+    an output's variants keep their row order. YAML (needs PyYAML): a mapping
+    of output -> mapping of variant -> pdf. PDF paths are relative to the
+    manifest's folder (``db:PRODUCT`` sources are kept as given), output paths
+    to ``out_dir`` (default: the same folder).
+    Raises ``ValueError`` for a malformed manifest.
+    """
+    base = path.parent
+    outputs: Dict[str, List[Tuple[str, str]]] = {}
+    if path.suffix.lower() in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError('YAML manifests need PyYAML (pip install pyyaml); use a CSV manifest instead')
+        data = yaml.safe_load(path.read_text(encoding='utf-8')) or {}
+        if not isinstance(data, dict) or not all(isinstance(v, dict) and v for v in data.values()):
+            raise ValueError(f'{path}: expected a mapping of output -> {{variant: pdf}}')
+        for out, variants in data.items():
+            outputs[str(out)] = [(str(var), str(pdf)) for var, pdf in variants.items()]
+    else:
+        with path.open(newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            missing = {'output', 'variant', 'pdf'} - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f"{path}: missing column(s) {', '.join(sorted(missing))}")
+            for n, row in enumerate(reader, start=2):
+                out, var, pdf = ((row[k] or '').strip() for k in ('output', 'variant', 'pdf'))
+                if not (out or var or pdf):
+                    continue
+                if not (out and var and pdf):
+                    raise ValueError(f'{path}:{n}: output, variant and pdf are all required')
+                outputs.setdefault(out, []).append((var, pdf))
+    if not outputs:
+        raise ValueError(f'{path}: no outputs listed')
+    out_dir = out_dir or base
+    # db:PRODUCT sources name a product, not a file: only PDF paths are relative to the manifest
+    return [(str(out_dir / out), [(var, Path(pdf) if db_product(pdf) is not None else base / pdf)
+                                  for var, pdf in specs])
+            for out, specs in outputs.items()]
+
+def _source_key(src: Path) -> Union[str, Path]:
+    """Identity of a variant source: the product of ``db:PRODUCT``, else the resolved PDF path."""
+    product = db_product(src)
+    return DB_SOURCE + normalize_text(product) if product is not None else src.resolve()
+
+def run_manifest(programs: List[Program], jobs: int = 1, cache: Optional[ParseCache] = None,
+                 template: bool = False, constant_memory: bool = False,
+                 metrics: Optional[PageMetricsLog] = None, engine: str = 'tables',
+                 bom_db: Path = DEFAULT_BOM_DB) -> List[Dict]:
+    """Build every output of a manifest, returning one summary row per output.
+
+    All PDFs go through one pool of ``jobs`` parser processes, largest first,
+    and a PDF shared by several outputs is parsed once. Outputs are then
+    merged and written in manifest order; one without any parsable variant
+    is not written.
+    """
+    specs: List[Tuple[str, Path]] = []
+    index: Dict[Path, int] = {}
+    for _, variants in programs:
+        for _, pdf in variants:
+            key = _source_key(pdf)
+            if key not in index:
+                index[key] = len(specs)
+                specs.append((pdf.name, pdf))
+
+    timings: Dict[int, float] = {}
+    sheets, failures = ingest_variants(specs, jobs=jobs, cache=cache, template=template, timings=timings,
+                                       metrics=metrics, engine=engine, bom_db=bom_db)
+    failed = {index[_source_key(pdf)] for _, pdf, _ in failures}
+    parsed = iter(sheets)
+    results = {i: next(parsed)[1:] for i in range(len(specs)) if i not in failed}
+
+    summary = []
+    for out, variants in programs:
+        t0 = time.perf_counter()
+        idxs = [index[_source_key(pdf)] for _, pdf in variants]
+        out_sheets = [(var, *results[i]) for (var, _), i in zip(variants, idxs) if i in results]
+        row = {
+            'output': out,
+            'variants': len(variants),
+            'failed': [var for (var, _), i in zip(variants, idxs) if i not in results],
+            'rows': None,
+            'parse_s': sum(timings.get(i, 0.0) for i in idxs),
+            'write_s': None,
+        }
+        if out_sheets:
+            Path(out).parent.mkdir(parents=True, exist_ok=True)
+            result = merge_variants(out_sheets)
+            _render_combined(result, Path(out), constant_memory)
+            row['rows'] = len(result.order)
+            row['write_s'] = time.perf_counter() - t0
+        else:
+            logging.error('%s: no variant could be parsed; not written', out)
+        summary.append(row)
+    return summary
+
+def print_summary(summary: List[Dict]) -> None:
+    w = max(len('output'), *(len(row['output']) for row in summary)) + 2
+    print(f"{'output':<{w}}{'variants':>9}{'rows':>7}{'parse s':>9}{'write s':>9}  status")
+    for row in summary:
+        rows = '-' if row['rows'] is None else row['rows']
+        write_s = '-' if row['write_s'] is None else f"{row['write_s']:.2f}"
+        status = ('not written' if row['rows'] is None else
+                  f"failed: {', '.join(row['failed'])}" if row['failed'] else 'ok')
+        print(f"{row['output']:<{w}}{row['variants']:>9}{rows:>7}{row['parse_s']:>9.2f}{write_s:>9}  {status}")
 
 # ───────────── CLI ─────────────
 def main() -> None:
     parser = argparse.ArgumentParser(description='Generate Combined SOV from BOM PDFs')
     parser.add_argument('-s', '--sheet', action='append', nargs=2,
-                        metavar=('VAR', 'PDF'), required=True,
+                        metavar=('VAR', 'PDF'),
                         help='Variant name + PDF path')
-    parser.add_argument('-o', '--output', required=True, help='Output XLSX path')
+    parser.add_argument('-b', '--batch', action='append', nargs='+', metavar=('PROGRAM', 'VAR=PDF'),
+                        help='A whole program: its sheet name, then its variants as VAR=PDF '
+                             '(repeatable; replaces -s, each program gets its own sheet)')
+    parser.add_argument('--separate', action='store_true',
+                        help='With --batch, treat -o as a folder and write one PROGRAM.xlsx per program')
+    parser.add_argument('-m', '--manifest', type=Path,
+                        help='Build every output listed in a CSV (output,variant,pdf) or YAML manifest; '
+                             '-o then optionally names the folder for relative outputs')
+    parser.add_argument('-o', '--output', help='Output XLSX path')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Worker processes: variants are parsed concurrently, or the pages '
+                             'of a single PDF (default: 1)')
+    parser.add_argument('--table-template', action='store_true',
+                        help='Learn the BOM table layout once and reuse it on later pages '
+                             '(falls back to full table detection when a page does not match)')
+    parser.add_argument('--engine', choices=ENGINES, default='tables',
+                        help="Table reader: 'tables' runs pdfplumber table detection on every page; "
+                             "'words' groups the page's words into the ruled columns and rows directly "
+                             "(falls back to 'tables' on pages it cannot read) (default: %(default)s)")
+    parser.add_argument('--from-db', metavar='DB', type=Path, default=DEFAULT_BOM_DB,
+                        help='convert.py database that variants given as db:PRODUCT instead of a PDF '
+                             'are read from, e.g. -s 080A db:66401-080A (default: %(default)s)')
+    parser.add_argument('--cache-dir', type=Path, default=DEFAULT_CACHE_DIR,
+                        help='Parse cache directory (default: %(default)s)')
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help='Evict least recently used cache entries above this size (default: %(default)s)')
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument('--no-cache', action='store_true', help='Neither read nor write the parse cache')
+    cache_mode.add_argument('--rebuild-cache', action='store_true',
+                            help='Re-parse every PDF and overwrite its cache entry')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep the parsed variants in OUTPUT.state.json and, on later runs, '
+                             're-parse only the variants whose PDF changed (-s only)')
+    parser.add_argument('--constant-memory', action='store_true',
+                        help='Stream the XLSX to disk row by row (flat memory for very large SOVs)')
+    parser.add_argument('--metrics', metavar='FILE.jsonl', type=Path,
+                        help='Append one JSON record per parsed page (row counts, header detection, '
+                             'heuristic flags, seconds) to this file')
+    parser.add_argument('--profile', metavar='REPORT.json',
+                        help='Write wall/CPU time per stage and per page to this JSON report '
+                             '(parses in-process, without the parse cache)')
+    parser.add_argument('--pstats', metavar='FILE', help='With --profile, also dump cProfile stats here')
     parser.add_argument('--log', default='INFO', help='Log level')
     args = parser.parse_args()
+    if args.pstats and not args.profile:
+        parser.error('--pstats needs --profile')
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
+    if sum(map(bool, (args.sheet, args.batch, args.manifest))) != 1:
+        parser.error('give one of -s/--sheet, -b/--batch or -m/--manifest')
+    if not (args.output or args.manifest):
+        parser.error('-o/--output is required')
+    if args.separate and not args.batch:
+        parser.error('--separate needs --batch')
+    if args.incremental and not args.sheet:
+        parser.error('--incremental needs -s/--sheet')
+    programs: List[Program] = []
+    if args.manifest:
+        try:
+            programs = load_manifest(args.manifest, Path(args.output) if args.output else None)
+        except (OSError, ValueError) as exc:
+            parser.error(f'--manifest: {exc}')
+    if args.sheet:
+        programs.append(('Combined', [(var, Path(pdf)) for var, pdf in args.sheet]))
+    for prog, *pairs in args.batch or []:
+        if not pairs or any('=' not in pair for pair in pairs):
+            parser.error(f'--batch {prog}: give the variants as VAR=PDF')
+        programs.append((prog, [(var, Path(pdf)) for var, pdf in (pair.split('=', 1) for pair in pairs)]))
 
     setup_logging(args.log)
-    sheets: List[Tuple[str, List[Dict], str, str]] = []
-    for var, pdf in args.sheet:
-        p = Path(pdf)
-        if not p.is_file():
-            logging.error('PDF not found: %s', pdf)
-            sys.exit(1)
-        ents = parse_bom_pdf(p)
-        cust, prod = parse_pdf_metadata(p)
-        sheets.append((var, ents, cust, prod))
-
-    write_combined_excel(sheets, Path(args.output))
-
+    # -b and -m report a missing source as that variant's failure and build the rest
+    for _, specs in ([] if args.manifest or args.batch else programs):
+        for _, pdf in specs:
+            if db_product(pdf) is not None:
+                if not args.from_db.is_file():
+                    logging.error('BOM database not found: %s', args.from_db)
+                    sys.exit(1)
+            elif not pdf.is_file():
+                logging.error('PDF not found: %s', pdf)
+                sys.exit(1)
+
+    if args.profile:
+        if args.jobs > 1 or not args.no_cache:
+            logging.info('--profile: parsing every PDF in this process, without the parse cache')
+        args.jobs, args.no_cache = 1, True  # stages are timed in this process, and a cache hit skips them
+        _run_profiled(args, programs)
+    else:
+        _run(args, programs)
+
+def _run_profiled(args: argparse.Namespace, programs: List[Program]) -> None:
+    """:func:`_run` with :data:`PROFILE` (and cProfile, for --pstats) recording."""
+    profiler = None
+    if args.pstats:
+        import cProfile
+        profiler = cProfile.Profile()
+    PROFILE.enable()
+    if profiler is not None:
+        profiler.enable()
     try:
-        if sys.platform == 'win32':
-            subprocess.run(['start', args.output], check=False, shell=True)
-        elif sys.platform == 'darwin':
-            subprocess.run(['open', args.output], check=False)
+        _run(args, programs)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.pstats)
+            logging.info('cProfile stats → %s', args.pstats)
+        report = {'argv': sys.argv[1:], **PROFILE.report()}
+        Path(args.profile).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+        logging.info('Profile report → %s', args.profile)
+
+def _run(args: argparse.Namespace, programs: List[Program]) -> None:
+    cache = None if args.no_cache else ParseCache(args.cache_dir, args.cache_size_mb << 20,
+                                                  rebuild=args.rebuild_cache)
+    metrics = PageMetricsLog(args.metrics) if args.metrics else None
+    if args.manifest:
+        summary = run_manifest(programs, jobs=args.jobs, cache=cache, template=args.table_template,
+                               constant_memory=args.constant_memory, metrics=metrics, engine=args.engine,
+                               bom_db=args.from_db)
+        print_summary(summary)
+        sys.exit(1 if any(row['failed'] or row['rows'] is None for row in summary) else 0)
+    if args.batch:
+        failures: List[Tuple[str, str, Path, BaseException]] = []
+        results = ingest_programs(programs, jobs=args.jobs, cache=cache, template=args.table_template,
+                                  failures=failures, metrics=metrics, engine=args.engine,
+                                  bom_db=args.from_db)
+        written = write_batch_excel(results, Path(args.output), separate=args.separate,
+                                    constant_memory=args.constant_memory)
+        if not written:
+            sys.exit(1)
+    else:
+        specs = programs[0][1]
+        if args.incremental:
+            state = BuildState.for_output(Path(args.output)).load()
+            sheets, failures = ingest_incremental(specs, state, jobs=args.jobs, cache=cache,
+                                                  template=args.table_template, metrics=metrics,
+                                                  engine=args.engine, bom_db=args.from_db)
         else:
-            subprocess.run(['xdg-open', args.output], check=False)
-    except Exception:
-        logging.warning("Couldn't auto-open %s", args.output)
+            sheets, failures = ingest_variants(specs, jobs=args.jobs, cache=cache,
+                                               template=args.table_template, metrics=metrics,
+                                               engine=args.engine, bom_db=args.from_db)
+        if not sheets:
+            logging.error('No variant could be parsed')
+            sys.exit(1)
+        if failures:
+            logging.warning('Writing %s without failed variant(s): %s',
+                            args.output, ', '.join(var for var, _, _ in failures))
+        write_combined_excel(sheets, Path(args.output), constant_memory=args.constant_memory)
+        if args.incremental:
+            state.save(var for var, _, _, _ in sheets)
+
+    if not args.separate:
+        try:
+            if sys.platform == 'win32':
+                subprocess.run(['start', args.output], check=False, shell=True)
+            elif sys.platform == 'darwin':
+                subprocess.run(['open', args.output], check=False)
+            else:
+                subprocess.run(['xdg-open', args.output], check=False)
+        except Exception:
+            logging.warning("Couldn't auto-open %s", args.output)
+
+    if failures:
+        sys.exit(1)
 
 if __name__ == '__main__':
     main()
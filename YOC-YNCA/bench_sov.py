@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for YC-SOV_to_YNA-SOV.py.
+
+Times each pipeline stage separately:
+- parse_bom_pdf
+- parse_words: parse_bom_pdf with the word engine (--engine words)
+- parse_pdf_metadata
+- get_deleted_indices (page layout is loaded before the clock starts)
+- merge: merge_variants
+- render: the XLSX rendering of write_combined_excel
+- render_constant_memory: the same, streamed with --constant-memory
+
+Startup: wall time of `--help` for each CLI script, and which heavy modules
+(pandas, numpy, pdfplumber, xlsxwriter) it imports. None should: they are
+loaded only by the code paths that need them. A heavy import or a `--help`
+slower than --startup-budget fails the run (exit status 1); --startup runs
+only this check.
+
+Cases:
+- the real PDFs in this folder: one case per PDF, plus all of them as the
+  variants of one SOV
+- synthetic BOMs from synth_bom.py, scaled by pages x variants
+
+Results are saved as JSON. --compare prints the change against an earlier
+run.
+
+Parity: every case also checks that the word engine yields exactly the
+entries of the table engine, and that it read every page holding a BOM
+table itself (falling back to table detection on a page fails the check). --parity runs only that check, over every
+case's PDFs plus a synthetic BOM whose header has no NOTE column, and exits
+non-zero on any difference.
+
+Memory: --memory streams a small and a large synthetic BOM through
+iter_bom_entries, each in a fresh process, and exits non-zero if peak RSS
+grows with the page count by more than --rss-tolerance MB (Unix only).
+
+Usage:
+  python bench_sov.py                               # standard preset
+  python bench_sov.py --preset quick -o before.json
+  python bench_sov.py --case 1000x1 --case 10x100 --no-real --compare before.json
+  python bench_sov.py --parity --preset quick
+  python bench_sov.py --memory
+  python bench_sov.py --startup
+"""
+
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pdfplumber
+
+import synth_bom
+
+HERE = Path(__file__).resolve().parent
+CLI_SCRIPTS = ['YC-SOV_to_YNA-SOV.py', 'multi.py', 'convert.py', 'query_bom.py', 'extract.py', 'test.py']
+HEAVY_MODULES = {'pandas', 'numpy', 'pdfplumber', 'xlsxwriter'}
+STAGES = ['parse_bom_pdf', 'parse_words', 'parse_pdf_metadata', 'get_deleted_indices', 'merge', 'render',
+          'render_constant_memory']
+MEMORY_PAGES = (10, 200)  # small and large BOM of the --memory check
+PRESETS: Dict[str, List[Tuple[int, int]]] = {   # (pages, variants)
+    'quick': [(1, 1), (10, 5)],
+    'standard': [(1, 1), (10, 5), (100, 3), (5, 100)],
+    'full': [(1, 1), (10, 5), (100, 10), (1000, 1), (10, 100)],
+}
+
+def load_sov():
+    """Import the generator script (its file name is not a module name)."""
+    spec = importlib.util.spec_from_file_location('sov', HERE / 'YC-SOV_to_YNA-SOV.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def best_of(repeat: int, fn: Callable[[], object]) -> Tuple[float, object]:
+    """Fastest wall time of ``repeat`` calls, and the last result."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+def peak_rss_mb(pdf: Path) -> Optional[float]:
+    """Peak RSS of a fresh process streaming ``pdf`` through iter_bom_entries."""
+    try:
+        out = subprocess.run([sys.executable, __file__, '--rss-probe', str(pdf)],
+                             capture_output=True, text=True, check=True, cwd=HERE)
+        return float(out.stdout.strip())
+    except (subprocess.CalledProcessError, ValueError) as exc:
+        logging.warning('RSS probe failed for %s: %s', pdf, exc)
+        return None
+
+def _rss_probe(pdf: str) -> None:
+    import resource  # Unix only; the probe reports nothing elsewhere
+    sov = load_sov()
+    for _ in sov.iter_bom_entries(Path(pdf)):
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(rss / (1 << 20) if sys.platform == 'darwin' else rss / 1024)
+
+def memory_is_flat(workdir: Path, seed: int, tolerance_mb: float) -> bool:
+    """Whether streaming a large BOM peaks within ``tolerance_mb`` of a small one."""
+    peaks = {}
+    for pages in MEMORY_PAGES:
+        pdf = synth_bom.generate_variants(workdir, pages, 1, seed)[0]
+        peaks[pages] = peak_rss_mb(pdf)
+        if peaks[pages] is None:
+            return False
+    small, large = (peaks[n] for n in MEMORY_PAGES)
+    growth = large - small
+    print(f'Peak RSS streaming {MEMORY_PAGES[0]} pages: {small:.1f} MB, {MEMORY_PAGES[1]} pages: {large:.1f} MB '
+          f'(+{growth:.1f} MB, tolerance {tolerance_mb:g} MB)')
+    return growth <= tolerance_mb
+
+def startup_cost(script: str, repeat: int) -> Dict:
+    """Fastest ``script --help`` wall time and the heavy modules it imports."""
+    cmd = [sys.executable, script, '--help']
+    seconds, _ = best_of(repeat, lambda: subprocess.run(cmd, capture_output=True, check=True, cwd=HERE))
+    trace = subprocess.run([sys.executable, '-X', 'importtime', *cmd[1:]],
+                           capture_output=True, text=True, check=True, cwd=HERE).stderr
+    loaded = {line.rsplit('|', 1)[-1].strip() for line in trace.splitlines() if '|' in line}
+    heavy = sorted(HEAVY_MODULES & loaded)
+    return {'help_seconds': round(seconds, 4), 'heavy_imports': heavy}
+
+def startup_ok(startup: Dict[str, Dict], budget: float) -> bool:
+    """Whether every script's ``--help`` stays free of heavy imports and within ``budget`` seconds."""
+    ok = True
+    for script, cost in startup.items():
+        if cost['heavy_imports']:
+            logging.error('%s --help imports %s', script, ', '.join(cost['heavy_imports']))
+            ok = False
+        if cost['help_seconds'] > budget:
+            logging.error('%s --help took %.3fs, over the %.3fs budget', script, cost['help_seconds'], budget)
+            ok = False
+    return ok
+
+def parse_words(sov, pdf: Path) -> Tuple[object, int, int]:
+    """``pdf`` parsed by the word engine, with the number of pages it read
+    itself and of pages holding a BOM table (from the page-metrics log)."""
+    fd, log = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    try:
+        words = sov.parse_bom_pdf(pdf, engine='words', metrics=sov.PageMetricsLog(Path(log)))
+        with open(log, encoding='utf-8') as f:
+            headers = [json.loads(line)['header'] for line in f]
+    finally:
+        os.unlink(log)
+    return words, headers.count('words'), len(headers) - headers.count('no_table')
+
+def engines_agree(sov, pdf: Path, table=None, coverage: Optional[List[int]] = None) -> bool:
+    """Whether the word and table engines parse ``pdf`` to the same entries,
+    with the word engine reading every table page itself.
+
+    ``coverage``, if given, is a ``[word pages, table pages]`` total to add to.
+    """
+    tables = list(table if table is not None else sov.parse_bom_pdf(pdf))
+    words, word_pages, table_pages = parse_words(sov, pdf)
+    words = list(words)
+    if coverage is not None:
+        coverage[0] += word_pages
+        coverage[1] += table_pages
+    if word_pages < table_pages:
+        logging.error('%s: the word engine read %d of %d table page(s); the rest fell back to tables',
+                      pdf.name, word_pages, table_pages)
+        return False
+    if words == tables:
+        return True
+    diff = next((i for i, (a, b) in enumerate(zip(tables, words)) if a != b), min(len(tables), len(words)))
+    logging.error('%s: engines differ (tables %d entries, words %d; first difference at entry %d)',
+                  pdf.name, len(tables), len(words), diff)
+    return False
+
+def time_deleted_indices(sov, pdf: Path) -> float:
+    total = 0.0
+    with pdfplumber.open(pdf) as doc:
+        for page in doc.pages:
+            page.chars, page.lines, page.curves  # lay the page out before timing
+            t0 = time.perf_counter()
+            sov.get_deleted_indices(page)
+            total += time.perf_counter() - t0
+            page.close()
+    return total
+
+def run_case(sov, name: str, pdfs: List[Path], repeat: int, out_dir: Path, rss: bool) -> Dict:
+    logging.info('Case %s: %d PDF(s)', name, len(pdfs))
+    seconds = dict.fromkeys(STAGES, 0.0)
+    sheets = []
+    pages = 0
+    parity = True
+    for pdf in pdfs:
+        t, table = best_of(repeat, lambda: sov.parse_bom_pdf(pdf))
+        seconds['parse_bom_pdf'] += t
+        t, _ = best_of(repeat, lambda: sov.parse_bom_pdf(pdf, engine='words'))
+        seconds['parse_words'] += t
+        parity = engines_agree(sov, pdf, table) and parity
+        t, (cust, prod) = best_of(repeat, lambda: sov.parse_pdf_metadata(pdf))
+        seconds['parse_pdf_metadata'] += t
+        seconds['get_deleted_indices'] += min(time_deleted_indices(sov, pdf) for _ in range(repeat))
+        with pdfplumber.open(pdf) as doc:
+            pages += len(doc.pages)
+        sheets.append((pdf.stem, table, cust, prod))
+
+    seconds['merge'], merged = best_of(repeat, lambda: sov.merge_variants(sheets))
+    xlsx = out_dir / f"{name.replace('/', '_')}.xlsx"
+    seconds['render'], _ = best_of(repeat, lambda: sov._render_combined(merged, xlsx))
+    seconds['render_constant_memory'], _ = best_of(
+        repeat, lambda: sov._render_combined(merged, xlsx, constant_memory=True))
+
+    result = {
+        'pdfs': len(pdfs),
+        'pages': pages,
+        'entries': sum(len(t) for _, t, _, _ in sheets),
+        'merged_rows': len(merged.order),
+        'engine_parity': parity,
+        'xlsx_bytes': xlsx.stat().st_size,
+        'peak_rss_mb': peak_rss_mb(max(pdfs, key=lambda p: p.stat().st_size)) if rss else None,
+        'seconds': {k: round(v, 4) for k, v in seconds.items()},
+    }
+    logging.info('Case %s: %s', name, ', '.join(f'{k} {v:.3f}s' for k, v in result['seconds'].items()))
+    return result
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, check=True, cwd=HERE)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_results(results: Dict, baseline: Optional[Dict] = None) -> None:
+    old_startup = baseline.get('startup', {}) if baseline else {}
+    for script, cost in results['startup'].items():
+        line = f"{script + ' --help':<32}{cost['help_seconds']:>8.3f}s"
+        old = old_startup.get(script, {}).get('help_seconds')
+        if old:
+            line += f"  before {old:.3f}s ({cost['help_seconds'] / old:.2f}x)"
+        if cost['heavy_imports']:
+            line += f"  imports {', '.join(cost['heavy_imports'])}"
+        print(line)
+    print()
+
+    old_cases = baseline['cases'] if baseline else {}
+    w = max(len(name) for name in results['cases']) + 2
+    header = f"{'case':<{w}}{'stage':<24}{'seconds':>10}"
+    if baseline:
+        header += f"{'before':>10}{'ratio':>8}"
+    print(header)
+    for name, case in results['cases'].items():
+        for stage in STAGES:
+            new = case['seconds'][stage]
+            line = f'{name:<{w}}{stage:<24}{new:>10.3f}'
+            old = old_cases.get(name, {}).get('seconds', {}).get(stage)
+            if baseline and old is not None:
+                line += f'{old:>10.3f}' + (f'{new / old:>8.2f}' if old else f"{'-':>8}")
+            print(line)
+        extra = f"pages={case['pages']} entries={case['entries']} xlsx={case['xlsx_bytes']}B"
+        if not case.get('engine_parity', True):
+            extra += ' ENGINES DIFFER'
+        if case.get('peak_rss_mb') is not None:
+            extra += f" rss={case['peak_rss_mb']:.0f}MB"
+        print(f"{'':<{w}}{extra}")
+
+# ───────────── CLI ─────────────
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark the BOM PDF → SOV pipeline stage by stage')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='standard',
+                        help='Synthetic cases to run (default: %(default)s)')
+    parser.add_argument('--case', action='append', metavar='PAGESxVARIANTS',
+                        help='Synthetic case instead of the preset, e.g. 100x10 (repeatable)')
+    parser.add_argument('--no-real', action='store_true', help='Skip the real PDFs in this folder')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per stage, fastest kept (default: 1)')
+    parser.add_argument('--parity', action='store_true',
+                        help='Only check that --engine words parses every case like the table engine')
+    parser.add_argument('--rss', action='store_true',
+                        help='Also measure peak RSS of a streaming parse of each case (Unix only)')
+    parser.add_argument('--startup', action='store_true',
+                        help='Only check the --help time and imports of every CLI script')
+    parser.add_argument('--startup-budget', type=float, default=0.3, metavar='SECONDS',
+                        help='Slowest --help a CLI script may have (default: %(default)s)')
+    parser.add_argument('--memory', action='store_true',
+                        help='Only check that a streaming parse keeps peak RSS flat as the page count grows '
+                             '(Unix only)')
+    parser.add_argument('--rss-tolerance', type=float, default=20.0, metavar='MB',
+                        help='Peak RSS growth --memory allows from %d to %d pages (default: %%(default)s)'
+                             % MEMORY_PAGES)
+    parser.add_argument('--workdir', type=Path, default=Path(tempfile.gettempdir()) / 'yc-sov-bench',
+                        help='Where synthetic PDFs and XLSX outputs go; PDFs are reused (default: %(default)s)')
+    parser.add_argument('-o', '--output', type=Path,
+                        help='Results JSON (default: bench-<timestamp>.json in the current folder)')
+    parser.add_argument('--compare', type=Path, help='Earlier results JSON to compare against')
+    parser.add_argument('--seed', type=int, default=0, help='Synthetic BOM seed (default: %(default)s)')
+    parser.add_argument('--log', default='INFO', help='Log level')
+    parser.add_argument('--rss-probe', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.rss_probe:
+        _rss_probe(args.rss_probe)
+        return
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+    try:
+        grid = [tuple(int(n) for n in c.lower().split('x')) for c in args.case] if args.case else PRESETS[args.preset]
+    except ValueError:
+        parser.error('--case takes PAGESxVARIANTS, e.g. 100x10')
+    if any(len(c) != 2 or min(c) < 1 for c in grid):
+        parser.error('--case takes PAGESxVARIANTS, both at least 1')
+
+    logging.basicConfig(level=getattr(logging, args.log.upper(), logging.INFO),
+                        format='%(asctime)s %(levelname)-8s %(message)s')
+    args.workdir.mkdir(parents=True, exist_ok=True)
+    if args.memory:
+        sys.exit(0 if memory_is_flat(args.workdir, args.seed, args.rss_tolerance) else 1)
+    if args.startup:
+        startup = {script: startup_cost(script, max(args.repeat, 3)) for script in CLI_SCRIPTS}
+        for script, cost in startup.items():
+            print(f"{script + ' --help':<32}{cost['help_seconds']:>8.3f}s  {' '.join(cost['heavy_imports'])}")
+        sys.exit(0 if startup_ok(startup, args.startup_budget) else 1)
+    sov = load_sov()
+
+    cases: List[Tuple[str, List[Path]]] = []
+    if not args.no_real:
+        real = sorted(HERE.glob('*.pdf'))
+        cases += [(f'real/{p.stem}', [p]) for p in real]
+        if len(real) > 1:
+            cases.append(('real/all', real))
+    for pages, variants in grid:
+        logging.info('Generating synthetic BOMs: %d pages x %d variants', pages, variants)
+        cases.append((f'synth/{pages}x{variants}',
+                      synth_bom.generate_variants(args.workdir, pages, variants, args.seed)))
+
+    if args.parity:
+        pdfs = sorted({pdf for _, case_pdfs in cases for pdf in case_pdfs})
+        pdfs += synth_bom.generate_variants(args.workdir, 2, 1, args.seed, note_header=False)
+        coverage = [0, 0]
+        bad = [pdf for pdf in pdfs if not engines_agree(sov, pdf, coverage=coverage)]
+        print(f'{len(pdfs) - len(bad)} of {len(pdfs)} PDF(s) parse the same with both engines; '
+              f'the word engine read {coverage[0]} of {coverage[1]} table page(s) itself')
+        sys.exit(1 if bad or not coverage[0] else 0)
+
+    results = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pdfplumber': pdfplumber.__version__,
+        'repeat': args.repeat,
+        'startup': {script: startup_cost(script, max(args.repeat, 3)) for script in CLI_SCRIPTS},
+        'cases': {name: run_case(sov, name, pdfs, args.repeat, args.workdir, args.rss) for name, pdfs in cases},
+    }
+    out = args.output or Path(f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    out.write_text(json.dumps(results, indent=2), encoding='utf-8')
+    logging.info('Results written to %s', out)
+
+    baseline = json.loads(args.compare.read_text(encoding='utf-8')) if args.compare else None
+    print_results(results, baseline)
+    if not startup_ok(results['startup'], args.startup_budget):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
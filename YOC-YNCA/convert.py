@@ -1,9 +1,16 @@
 import re
-import pdfplumber
 import sqlite3
 import os
 import sys
 import argparse
+import hashlib
+import multiprocessing
+import queue
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from strike_marks import get_deleted_indices
 
 def clean_cell(text):
     """Normalize a cell: turn None → ""; strip newlines/whitespace."""
@@ -15,176 +22,573 @@ def strip_non_ascii(s: str) -> str:
     """Remove any non‑ASCII characters (e.g. Japanese) from the string."""
     return re.sub(r'[^\x00-\x7F]+', '', s)
 
-def parse_bom(pdf_path, db_path):
-    # --- 1) Sanity checks & reset ---
-    if not os.path.exists(pdf_path):
-        print(f"PDF not found: {pdf_path}")
-        sys.exit(1)
-    if os.path.exists(db_path):
-        print(f"Removing old database '{db_path}'…")
-        os.remove(db_path)
+def iter_bom_rows(pdf, verbose=True):
+    """
+    Yield one entry dict per BOM row, page by page.
+    Each page's layout is released as soon as its table is read,
+    so memory stays flat however many pages the BOM has.
+    """
+    for pg, page in enumerate(pdf.pages, start=1):
+        if verbose:
+            print(f"  • Page {pg}…")
+        tables = page.extract_tables()
+        struck = get_deleted_indices(page) if tables else set()
+        page.close()  # tables are plain lists now; drop the page's layout
+        if not tables:
+            continue
+        tbl = tables[0]
 
-    all_entries = []
-    print(f"Opening PDF '{pdf_path}'…")
+        # find header row
+        header_idx = None
+        for i, row in enumerate(tbl[:6]):
+            low = [clean_cell(c).lower() for c in row]
+            if any("level" in c for c in low) \
+            and any("part number" in c for c in low) \
+            and any("qty" in c for c in low):
+                header_idx = i
+                break
+        if header_idx is None:
+            header_idx = 2
 
-    with pdfplumber.open(pdf_path) as pdf:
-        # metadata from first page
-        first_tbl = pdf.pages[0].extract_tables()[0]
-        product_name         = clean_cell(first_tbl[0][7])
-        product_number       = clean_cell(first_tbl[1][7])
-        customer_part_number = clean_cell(first_tbl[1][21])
+        header = tbl[header_idx]
+        # build column map (including “change”)
+        col_map = {}
+        for i, cell in enumerate(header):
+            t = clean_cell(cell).lower()
+            if "part number" in t:
+                col_map["part_number"] = i
+            elif any(x in t for x in ("draw.no", "draw no", "draw.")) and "product number" not in t:
+                col_map.setdefault("draw_no", i)
+            elif "part name" in t:
+                col_map["part_name"] = i
+            elif "qty" in t:
+                col_map["quantity"] = i
+            elif "note" in t:
+                col_map["note"] = i
+            elif "change" in t:
+                col_map["change"] = i
+
+        # fallbacks
+        col_map.setdefault("part_number", 6)
+        col_map.setdefault("draw_no",     17)
+        col_map.setdefault("part_name",   19)
+        col_map.setdefault("quantity",    23)
+        col_map.setdefault("note",        24)
+        col_map.setdefault("change",      None)
+
+        # scan data rows
+        for row in tbl[header_idx + 1 :]:
+            item_no = clean_cell(row[0])
+            if not item_no or not re.match(r'^\d+(\.\d+)?$', item_no):
+                continue
+
+            # level from cols 1–5
+            level = ""
+            for lvl in range(1, 6):
+                if lvl < len(row):
+                    v = clean_cell(row[lvl])
+                    if v:
+                        level = v
+                        break
+
+            # part_name (English only)
+            raw_name = clean_cell(row[col_map["part_name"]]) if col_map["part_name"] < len(row) else ""
+            eng_name = strip_non_ascii(raw_name)
+
+            # change column
+            raw_chg = ""
+            if col_map["change"] is not None and col_map["change"] < len(row):
+                raw_chg = clean_cell(row[col_map["change"]])
+            change_val = raw_chg or ""
+
+            entry = {
+                "page":        pg,
+                "item_no":     item_no,
+                "level":       level,
+                "part_number": clean_cell(row[col_map["part_number"]]) if col_map["part_number"] < len(row) else "",
+                "draw_no":     clean_cell(row[col_map["draw_no"]])     if col_map["draw_no"]     < len(row) else "",
+                "part_name":   eng_name,
+                # the cell as read (JP/EN lines), for the SOV generator's part-name rules
+                "name_raw":    (row[col_map["part_name"]] or "") if col_map["part_name"] < len(row) else "",
+                "quantity":    clean_cell(row[col_map["quantity"]])    if col_map["quantity"]    < len(row) else "",
+                "note":        clean_cell(row[col_map["note"]])        if col_map["note"]        < len(row) else "",
+                "change":      change_val,
+                "struck":      int(re.match(r"\d+", item_no).group(0)) in struck,
+            }
+            yield entry
+
+PART_INDEX = "CREATE INDEX IF NOT EXISTS bom_lines_part ON bom_lines(part_id, product_id, quantity)"
+
+# Typed, normalized layout: one row per product, one per distinct part
+# (number + name + note, so repeated strings are stored once) and one per BOM
+# line. bom_data is kept as a view with the old column names (BOM_DATA_VIEW).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id            INTEGER PRIMARY KEY,
+    product_number        TEXT NOT NULL UNIQUE,
+    product_name          TEXT,
+    customer_part_number  TEXT,
+    source_pdf            TEXT
+);
+CREATE TABLE IF NOT EXISTS parts (
+    part_id      INTEGER PRIMARY KEY,
+    part_number  TEXT NOT NULL,
+    part_name    TEXT NOT NULL,
+    note         TEXT NOT NULL,
+    UNIQUE(part_number, part_name, note)
+);
+CREATE TABLE IF NOT EXISTS bom_lines (
+    line_id     INTEGER PRIMARY KEY,
+    product_id  INTEGER NOT NULL REFERENCES products(product_id),
+    page        INTEGER NOT NULL,
+    item_no     TEXT NOT NULL,
+    level       INTEGER,
+    part_id     INTEGER NOT NULL REFERENCES parts(part_id),
+    draw_no     TEXT,
+    quantity    REAL,
+    change      TEXT,
+    name_raw    TEXT,                       -- part-name cell as read, JP and EN lines
+    struck      INTEGER NOT NULL DEFAULT 0  -- item struck out in red
+);
+-- (product, item_no): a product's BOM in item order; also keeps each line unique
+CREATE UNIQUE INDEX IF NOT EXISTS bom_lines_product_item ON bom_lines(product_id, item_no, page);
+-- where-used: part -> products and quantities without touching the table
+""" + PART_INDEX + """;
+-- parts by number: served by UNIQUE(part_number, part_name, note), which covers part_id;
+-- products by number: served by UNIQUE(product_number)
+
+-- one row per ingested PDF: what its rows were loaded from
+CREATE TABLE IF NOT EXISTS sources (
+    source_pdf      TEXT PRIMARY KEY,
+    sha256          TEXT NOT NULL,
+    product_number  TEXT,
+    rows            INTEGER,
+    loaded_at       TEXT
+);
+"""
+
+# the lines of every BOM as the PDFs show them, red-struck items left out
+BOM_DATA_VIEW = """
+CREATE VIEW bom_data AS
+SELECT l.line_id AS id, pr.source_pdf, pr.product_name, pr.product_number, pr.customer_part_number,
+       l.page, l.item_no, l.level, pa.part_number, l.draw_no, pa.part_name, l.quantity, pa.note, l.change
+FROM bom_lines l
+JOIN products pr ON pr.product_id = l.product_id
+JOIN parts pa ON pa.part_id = l.part_id
+WHERE NOT l.struck
+"""
+
+# moves the rows of the old all-TEXT bom_data table into the schema above
+MIGRATE_V1 = """
+INSERT OR IGNORE INTO products (product_number, product_name, customer_part_number, source_pdf)
+    SELECT nfkc(product_number), product_name, customer_part_number, source_pdf
+    FROM bom_data_v1 GROUP BY nfkc(product_number);
+INSERT OR IGNORE INTO parts (part_number, part_name, note)
+    SELECT nfkc(part_number), coalesce(part_name, ''), coalesce(note, '') FROM bom_data_v1;
+INSERT OR IGNORE INTO bom_lines (product_id, page, item_no, level, part_id, draw_no, quantity, change)
+    SELECT pr.product_id, b.page, nfkc(b.item_no), as_level(b.level), pa.part_id,
+           b.draw_no, as_quantity(b.quantity), b.change
+    FROM bom_data_v1 b
+    JOIN products pr ON pr.product_number = nfkc(b.product_number)
+    JOIN parts pa ON pa.part_number = nfkc(b.part_number)
+                 AND pa.part_name = coalesce(b.part_name, '') AND pa.note = coalesce(b.note, '')
+    ORDER BY b.id;
+-- v1 rows have no name_raw/struck: forget the hashes so every PDF is loaded again
+UPDATE sources SET product_number = nfkc(product_number), sha256 = '';
+DROP TABLE bom_data_v1;
+"""
+
+# columns added to bom_lines after the typed schema was introduced
+ADDED_COLUMNS = {
+    'name_raw': "TEXT",
+    'struck': "INTEGER NOT NULL DEFAULT 0",
+}
+
+def nfkc(text):
+    """Full-width part/product numbers (６６４０１－０８０Ａ) as ASCII (66401-080A)."""
+    return unicodedata.normalize("NFKC", text or "")
+
+def as_level(text):
+    text = nfkc(text)
+    return int(text) if text.isdigit() else None
+
+def as_quantity(text):
+    try:
+        return float(nfkc(text))
+    except ValueError:
+        return None
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def find_pdfs(paths):
+    """PDF paths as given, plus every *.pdf under the given directories."""
+    pdfs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                pdfs += [os.path.join(root, f) for f in sorted(files) if f.lower().endswith(".pdf")]
+        else:
+            pdfs.append(path)
+    return pdfs
+
+def open_db(db_path):
+    # autocommit mode: every load opens and commits its own transaction
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    # WAL: readers (query_bom.py) keep querying while a load writes; with WAL,
+    # synchronous=NORMAL only syncs at checkpoints and stays crash-safe
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    for fn in (nfkc, as_level, as_quantity):
+        conn.create_function(fn.__name__, 1, fn, deterministic=True)
+    old = conn.execute("SELECT type FROM sqlite_master WHERE name = 'bom_data'").fetchone()
+    if old is not None and old[0] == 'table':
+        print(f"Migrating '{db_path}' to the typed schema; its PDFs will be parsed again…")
+        conn.executescript("BEGIN IMMEDIATE;\nALTER TABLE bom_data RENAME TO bom_data_v1;\n"
+                           + SCHEMA + MIGRATE_V1 + "COMMIT;")
+    else:
+        conn.executescript(SCHEMA)
+    have = {r[1] for r in conn.execute("PRAGMA table_info(bom_lines)")}
+    missing = [col for col in ADDED_COLUMNS if col not in have]
+    if missing:
+        conn.execute("BEGIN IMMEDIATE")
+        for col in missing:
+            conn.execute(f"ALTER TABLE bom_lines ADD COLUMN {col} {ADDED_COLUMNS[col]}")
+        # the stored rows lack these columns: load every PDF again on the next run
+        conn.execute("UPDATE sources SET sha256 = ''")
+        conn.execute("COMMIT")
+    view = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'bom_data'").fetchone()
+    if view is None or view[0].strip() != BOM_DATA_VIEW.strip():
+        conn.executescript("BEGIN IMMEDIATE;\nDROP VIEW IF EXISTS bom_data;\n" + BOM_DATA_VIEW + ";\nCOMMIT;")
+    return conn
+
+def intern_part(cur, cache, part_number, part_name, note):
+    """part_id of a (part number, name, note) triple, adding it to ``parts`` if new."""
+    key = (part_number, part_name, note)
+    part_id = cache.get(key)
+    if part_id is None:
+        cur.execute("INSERT OR IGNORE INTO parts (part_number, part_name, note) VALUES (?, ?, ?)", key)
+        part_id = cache[key] = cur.execute(
+            "SELECT part_id FROM parts WHERE part_number = ? AND part_name = ? AND note = ?", key).fetchone()[0]
+    return part_id
+
+def read_metadata(pdf, verbose=True):
+    """(product name, product number, customer part number) from the first page's table."""
+    first_tbl = pdf.pages[0].extract_tables()[0]
+    product_name         = clean_cell(first_tbl[0][7])
+    product_number       = nfkc(clean_cell(first_tbl[1][7]))
+    customer_part_number = clean_cell(first_tbl[1][21])
+    if verbose:
         print(f"  • Product Name:  {product_name}")
         print(f"  • Product No.:   {product_number}")
         print(f"  • Cust P/N:      {customer_part_number}")
+    return product_name, product_number, customer_part_number
 
-        # iterate pages
-        for pg, page in enumerate(pdf.pages, start=1):
-            print(f"  • Page {pg}…")
-            tables = page.extract_tables()
-            if not tables:
-                continue
-            tbl = tables[0]
-
-            # find header row
-            header_idx = None
-            for i, row in enumerate(tbl[:6]):
-                low = [clean_cell(c).lower() for c in row]
-                if any("level" in c for c in low) \
-                and any("part number" in c for c in low) \
-                and any("qty" in c for c in low):
-                    header_idx = i
-                    break
-            if header_idx is None:
-                header_idx = 2
-
-            header = tbl[header_idx]
-            # build column map (including “change”)
-            col_map = {}
-            for i, cell in enumerate(header):
-                t = clean_cell(cell).lower()
-                if "part number" in t:
-                    col_map["part_number"] = i
-                elif any(x in t for x in ("draw.no", "draw no", "draw.")) and "product number" not in t:
-                    col_map.setdefault("draw_no", i)
-                elif "part name" in t:
-                    col_map["part_name"] = i
-                elif "qty" in t:
-                    col_map["quantity"] = i
-                elif "note" in t:
-                    col_map["note"] = i
-                elif "change" in t:
-                    col_map["change"] = i
-
-            # fallbacks
-            col_map.setdefault("part_number", 6)
-            col_map.setdefault("draw_no",     17)
-            col_map.setdefault("part_name",   19)
-            col_map.setdefault("quantity",    23)
-            col_map.setdefault("note",        24)
-            col_map.setdefault("change",      None)
-
-            # scan data rows
-            for row in tbl[header_idx + 1 :]:
-                item_no = clean_cell(row[0])
-                if not item_no or not re.match(r'^\d+(\.\d+)?$', item_no):
-                    continue
-
-                # level from cols 1–5
-                level = ""
-                for lvl in range(1, 6):
-                    if lvl < len(row):
-                        v = clean_cell(row[lvl])
-                        if v:
-                            level = v
-                            break
-
-                # part_name (English only)
-                raw_name = clean_cell(row[col_map["part_name"]]) if col_map["part_name"] < len(row) else ""
-                eng_name = strip_non_ascii(raw_name)
-
-                # change column
-                raw_chg = ""
-                if col_map["change"] is not None and col_map["change"] < len(row):
-                    raw_chg = clean_cell(row[col_map["change"]])
-                change_val = raw_chg or ""
-
-                entry = {
-                    "page":        pg,
-                    "item_no":     item_no,
-                    "level":       level,
-                    "part_number": clean_cell(row[col_map["part_number"]]) if col_map["part_number"] < len(row) else "",
-                    "draw_no":     clean_cell(row[col_map["draw_no"]])     if col_map["draw_no"]     < len(row) else "",
-                    "part_name":   eng_name,
-                    "quantity":    clean_cell(row[col_map["quantity"]])    if col_map["quantity"]    < len(row) else "",
-                    "note":        clean_cell(row[col_map["note"]])        if col_map["note"]        < len(row) else "",
-                    "change":      change_val,
-                }
-                all_entries.append(entry)
-
-    if not all_entries:
-        print("No SOV entries found.")
-        return
-
-    print(f"\nExtracted {len(all_entries)} entries.")
+def store_pdf(conn, source, digest, meta, entries, parts):
+    """Replace a product's BOM lines with ``entries`` and record the source.
 
-    # --- 4) Write to SQLite ---
-    conn = sqlite3.connect(db_path)
+    Runs inside the caller's transaction. Rows of the same product loaded
+    from another PDF (an older revision, a copy) are replaced too, so each
+    product has one BOM. ``parts`` caches part ids across calls; clear it if
+    the transaction is rolled back. Returns the number of rows written.
+    """
+    product_name, product_number, customer_part_number = meta
     cur = conn.cursor()
+    for (other,) in cur.execute(
+            "SELECT source_pdf FROM products WHERE product_number = ? AND source_pdf != ?",
+            (product_number, source)).fetchall():
+        print(f"  • {product_number}: replaces the rows loaded from '{other}'")
+    # this PDF may have described another product before it changed
     cur.execute("""
-    CREATE TABLE IF NOT EXISTS bom_data (
-        id                    INTEGER PRIMARY KEY AUTOINCREMENT,
-        source_pdf            TEXT,
-        product_name          TEXT,
-        product_number        TEXT,
-        customer_part_number  TEXT,
-        page                  INTEGER,
-        item_no               TEXT,
-        level                 TEXT,
-        part_number           TEXT,
-        draw_no               TEXT,
-        part_name             TEXT,
-        quantity              TEXT,
-        note                  TEXT,
-        change                TEXT,
-        UNIQUE(product_number, item_no, page)
-    )
-    """)
-    rows = [
-        (
-            pdf_path,
-            product_name,
-            product_number,
-            customer_part_number,
-            e["page"],
-            e["item_no"],
-            e["level"],
-            e["part_number"],
-            e["draw_no"],
-            e["part_name"],
-            e["quantity"],
-            e["note"],
-            e["change"]
-        )
-        for e in all_entries
-    ]
+    DELETE FROM bom_lines WHERE product_id IN (
+        SELECT product_id FROM products WHERE source_pdf = ? AND product_number != ?)
+    """, (source, product_number))
+    cur.execute("DELETE FROM products WHERE source_pdf = ? AND product_number != ?",
+                (source, product_number))
+    cur.execute("""
+    INSERT INTO products (product_number, product_name, customer_part_number, source_pdf)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(product_number) DO UPDATE SET
+        product_name = excluded.product_name,
+        customer_part_number = excluded.customer_part_number,
+        source_pdf = excluded.source_pdf
+    """, (product_number, product_name, customer_part_number, source))
+    product_id = cur.execute("SELECT product_id FROM products WHERE product_number = ?",
+                             (product_number,)).fetchone()[0]
+    cur.execute("DELETE FROM bom_lines WHERE product_id = ?", (product_id,))
+    cur.execute("UPDATE sources SET rows = 0 WHERE product_number = ?", (product_number,))
+
+    # parts are interned through their own cursor while executemany consumes rows()
+    cur_parts = conn.cursor()
+
+    def rows():
+        for e in entries:
+            yield (
+                product_id,
+                e["page"],
+                nfkc(e["item_no"]),
+                as_level(e["level"]),
+                intern_part(cur_parts, parts, nfkc(e["part_number"]), e["part_name"], e["note"]),
+                e["draw_no"],
+                as_quantity(e["quantity"]),
+                e["change"],
+                e["name_raw"],
+                int(e["struck"])
+            )
+
     cur.executemany("""
-    INSERT OR IGNORE INTO bom_data (
-        source_pdf, product_name, product_number, customer_part_number,
-        page, item_no, level, part_number, draw_no, part_name,
-        quantity, note, change
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, rows)
-    conn.commit()
+    INSERT OR IGNORE INTO bom_lines (
+        product_id, page, item_no, level, part_id, draw_no, quantity, change, name_raw, struck
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows())
+    n_rows = max(cur.rowcount, 0)
+    cur.execute("""
+    INSERT OR REPLACE INTO sources (source_pdf, sha256, product_number, rows, loaded_at)
+    VALUES (?, ?, ?, ?, datetime('now'))
+    """, (source, digest, product_number, n_rows))
+    return n_rows
+
+def load_pdf(conn, pdf_path, source, digest):
+    """Replace the rows of one BOM PDF in a single transaction.
+
+    ``source`` is the key the PDF's rows and ``sources`` record are stored
+    under. Rows are streamed from the pages straight into SQLite. Returns
+    the number of rows written.
+    """
+    import pdfplumber  # imported here so --help and usage errors start quickly
+    with pdfplumber.open(pdf_path) as pdf:
+        # don't keep every decoded page stream alive until the file is closed
+        pdf.doc.caching = False
+        meta = read_metadata(pdf)
+
+        # the old rows stay visible (and are kept if parsing fails) until COMMIT
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            n_rows = store_pdf(conn, source, digest, meta, iter_bom_rows(pdf), {})
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    if not n_rows:
+        print("No SOV entries found.")
+    return n_rows
+
+# ───────────── BULK LOAD ─────────────
+# Parser processes send each parsed PDF through a queue to one writer thread,
+# which owns the only connection and commits many PDFs per transaction.
+BATCH_ROWS = 50_000  # rows per write transaction
+COMMIT_IDLE_S = 1.0  # commit early when no parsed PDF has arrived for this long
+
+_results = None  # the queue, in parser processes
+
+def _init_parser(results):
+    global _results
+    _results = results
+
+def _parse_for_queue(order, pdf_path, source, digest):
+    """Parser process: parse one PDF and put (order, pdf, source, digest, meta, rows, error) on the queue."""
+    try:
+        import pdfplumber
+        with pdfplumber.open(pdf_path) as pdf:
+            pdf.doc.caching = False
+            meta = read_metadata(pdf, verbose=False)
+            rows = list(iter_bom_rows(pdf, verbose=False))
+        _results.put((order, pdf_path, source, digest, meta, rows, None))
+    except Exception as exc:
+        _results.put((order, pdf_path, source, digest, None, None, str(exc)))
+
+class BulkWriter(threading.Thread):
+    """The single SQLite writer of a bulk load.
+
+    Parsed PDFs are written in batched transactions of about ``batch_rows``
+    rows, in the order they finish parsing. When two PDFs of this load
+    describe the same product, the one later in load order is kept whichever
+    finishes first, as in a one-by-one load. Each PDF sits in its own savepoint, so one that fails to write is
+    rolled back without the rest of its batch. With ``defer_indexes`` the
+    where-used index is dropped for the load and built once at the end.
+    """
+
+    def __init__(self, db_path, results, batch_rows=BATCH_ROWS, defer_indexes=False):
+        super().__init__(name="bom-writer")
+        self.db_path = db_path
+        self.results = results
+        self.batch_rows = batch_rows
+        self.defer_indexes = defer_indexes
+        self.loaded, self.n_rows, self.failed = 0, 0, []
+        self.error = None
+
+    def run(self):
+        try:
+            self._write()
+        except BaseException as exc:  # reported by the caller after join()
+            self.error = exc
+            while self.results.get() is not None:  # keep draining so parsers never block
+                pass
+
+    def _write(self):
+        conn = open_db(self.db_path)
+        conn.execute("PRAGMA cache_size = -65536")  # 64 MiB
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if self.defer_indexes:
+            conn.execute("DROP INDEX IF EXISTS bom_lines_part")
+        parts, pending, in_tx = {}, 0, False
+        latest = {}  # product number -> (load order, PDF) of the PDF stored for it
+        while True:
+            try:
+                msg = self.results.get(timeout=COMMIT_IDLE_S)
+            except queue.Empty:
+                msg = ()
+            if in_tx and (not msg or pending >= self.batch_rows):
+                conn.execute("COMMIT")  # readers see everything written so far
+                pending, in_tx = 0, False
+            if msg is None:
+                break
+            if not msg:
+                continue
+            order, pdf_path, source, digest, meta, rows, error = msg
+            if error is not None:
+                print(f"  ✗ Failed to parse '{pdf_path}': {error}")
+                self.failed.append(pdf_path)
+                continue
+            if not in_tx:
+                conn.execute("BEGIN IMMEDIATE")
+                in_tx = True
+            later = latest.get(meta[1])
+            if later is not None and later[0] > order:
+                print(f"  • {meta[1]}: '{pdf_path}' is superseded by '{later[1]}'")
+                conn.execute("""
+                INSERT OR REPLACE INTO sources (source_pdf, sha256, product_number, rows, loaded_at)
+                VALUES (?, ?, ?, 0, datetime('now'))
+                """, (source, digest, meta[1]))
+                self.loaded += 1
+                continue
+            conn.execute("SAVEPOINT pdf")
+            try:
+                n = store_pdf(conn, source, digest, meta, rows, parts)
+            except sqlite3.Error as exc:
+                conn.execute("ROLLBACK TO pdf")
+                conn.execute("RELEASE pdf")
+                parts.clear()
+                print(f"  ✗ Failed to store '{pdf_path}': {exc}")
+                self.failed.append(pdf_path)
+                continue
+            conn.execute("RELEASE pdf")
+            latest[meta[1]] = (order, pdf_path)
+            print(f"  • {meta[1]}: {n} rows from '{pdf_path}'")
+            self.loaded += 1
+            self.n_rows += n
+            pending += n
+        if self.defer_indexes:
+            print("Building the where-used index…")
+            conn.execute(PART_INDEX)
+        conn.execute("PRAGMA optimize")
+        conn.close()
+
+def bulk_load(todo, db_path, jobs, defer_indexes=False, batch_rows=BATCH_ROWS):
+    """Parse ``todo`` (pdf, source, digest) in ``jobs`` processes into one writer thread.
+
+    Returns ``(loaded, rows, failed PDFs)``. See :class:`BulkWriter` for
+    ``defer_indexes`` and ``batch_rows``.
+    """
+    results = multiprocessing.Queue(maxsize=jobs * 2)  # parsers wait on a slow writer instead of piling up rows
+    writer = BulkWriter(db_path, results, batch_rows, defer_indexes)
+    writer.start()
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_parser, initargs=(results,)) as ex:
+            for order, (pdf_path, source, digest) in enumerate(todo):
+                ex.submit(_parse_for_queue, order, pdf_path, source, digest)
+    finally:
+        results.put(None)
+        writer.join()
+    if writer.error is not None:
+        raise writer.error
+    return writer.loaded, writer.n_rows, writer.failed
+
+def ingest(paths, db_path, rebuild=False, jobs=1):
+    """Load PDFs (and the PDFs in directories) into ``db_path`` incrementally.
+
+    Each source's SHA-256 is recorded in the ``sources`` table; a PDF whose
+    content is unchanged since it was loaded, or that duplicates a PDF
+    already loaded, is skipped. With ``jobs > 1`` the PDFs to load go
+    through :func:`bulk_load`. Returns the PDFs that failed to load.
+    """
+    pdfs = find_pdfs(paths)
+    if not pdfs:
+        print("No PDFs found.")
+        return []
+    if rebuild and os.path.exists(db_path):
+        print(f"Removing old database '{db_path}'…")
+        os.remove(db_path)
+
+    conn = open_db(db_path)
+    known = dict(conn.execute("SELECT source_pdf, sha256 FROM sources"))
+    loaded, skipped, n_rows, failed, todo = 0, 0, 0, [], []
+    for pdf_path in pdfs:
+        source = os.path.abspath(pdf_path)
+        try:
+            digest = file_sha256(pdf_path)
+        except OSError as exc:
+            print(f"PDF not readable: {pdf_path} ({exc})")
+            failed.append(pdf_path)
+            continue
+        if known.get(source) == digest:
+            print(f"Unchanged, skipped: '{pdf_path}'")
+            skipped += 1
+            continue
+        twin = next((src for src, h in known.items() if h == digest and src != source), None)
+        if twin is not None:
+            print(f"Same content as '{twin}', skipped: '{pdf_path}'")
+            skipped += 1
+            continue
+        known[source] = digest
+        todo.append((pdf_path, source, digest))
+
+    if jobs > 1 and len(todo) > 1:
+        # an initial load builds the where-used index once, after all rows are in
+        initial = not conn.execute("SELECT 1 FROM bom_lines LIMIT 1").fetchone()
+        conn.close()
+        print(f"Loading {len(todo)} PDF(s) with {jobs} parser processes…")
+        loaded, n_rows, failed_bulk = bulk_load(todo, db_path, jobs, defer_indexes=initial)
+        failed += failed_bulk
+        todo = []
+    for pdf_path, source, digest in todo:
+        print(f"Opening PDF '{pdf_path}'…")
+        try:
+            n = load_pdf(conn, pdf_path, source, digest)
+        except Exception as exc:
+            print(f"  ✗ Failed to load '{pdf_path}': {exc}")
+            failed.append(pdf_path)
+            continue
+        print(f"  • {n} rows written.")
+        loaded += 1
+        n_rows += n
     conn.close()
-    print(f"Done — {len(rows)} rows written to '{db_path}'.")
+
+    print(f"\nDone — {loaded} PDF(s) loaded ({n_rows} rows), {skipped} unchanged, "
+          f"{len(failed)} failed; database '{db_path}'.")
+    return failed
 
 if __name__ == "__main__":
-    p = argparse.ArgumentParser(description="Parse BOM PDF into SQLite")
-    p.add_argument("pdf_path", help="Path to the BOM PDF file")
+    p = argparse.ArgumentParser(description="Parse BOM PDFs into SQLite, re-loading only the ones that changed")
+    p.add_argument("paths", nargs="+", metavar="PDF_OR_DIR",
+                   help="BOM PDF files, or directories searched for *.pdf")
     p.add_argument(
         "-d", "--db",
         default="yazaki_bom.db",
-        help="SQLite database path (will be overwritten if exists)"
+        help="SQLite database path (created if missing, updated in place otherwise)"
     )
+    p.add_argument("--rebuild", action="store_true",
+                   help="Delete the database first and load every PDF from scratch")
+    p.add_argument("-j", "--jobs", type=int, default=1,
+                   help="Parser processes; above 1, PDFs are parsed in parallel and written "
+                        "by a single writer in batched transactions (default: 1)")
     args = p.parse_args()
-    parse_bom(args.pdf_path, args.db)
+    if args.jobs < 1:
+        p.error("--jobs must be at least 1")
+    failed = ingest(args.paths, args.db, rebuild=args.rebuild, jobs=args.jobs)
+    sys.exit(1 if failed else 0)
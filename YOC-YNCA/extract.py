@@ -17,13 +17,13 @@ import re
 import sys
 from pathlib import Path
 
-import pdfplumber
-
 def parse_sov_pdf(pdf_path: Path):
     """
     Parse the first table on each page of the SOV PDF,
     returning a list of dicts with part_number, part_name, drawing_no, quantity.
     """
+    import pdfplumber  # imported here so --help and usage errors start quickly
+
     entries = []
     for page in pdfplumber.open(str(pdf_path)).pages:
         tables = page.extract_tables()
@@ -15,11 +15,12 @@ import re
 import subprocess
 import sys
 import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
-import pdfplumber
-import pandas as pd
+# pdfplumber and xlsxwriter are imported where they are used, so --help and
+# argument errors start without them
 
 # ──────────────────────────────────────────────────────────────────────────────
 BLANK_WIDTHS = [4.22, 16.67, 43.47, 18.22, 17.78, 6.78, 13.78, 13.78, 13.78]
@@ -65,6 +66,8 @@ def normalize_text(s: str) -> str:
 
 def parse_bom_pdf(pdf_path: Path) -> List[Dict]:
     """Extract BOM entries from a PDF into structured records."""
+    import pdfplumber
+
     entries: List[Dict] = []
     with pdfplumber.open(str(pdf_path)) as pdf:
         for page in pdf.pages:
@@ -184,6 +187,8 @@ def parse_bom_pdf(pdf_path: Path) -> List[Dict]:
 
 def parse_pdf_metadata(pdf_path: Path) -> Tuple[str, str]:
     """Extract customer and product from PDF text without index errors."""
+    import pdfplumber
+
     # Concatenate all page text
     with pdfplumber.open(str(pdf_path)) as pdf:
         full_text = "".join(page.extract_text() or "" for page in pdf.pages)
@@ -203,6 +208,53 @@ def parse_pdf_metadata(pdf_path: Path) -> Tuple[str, str]:
     return "", ""
 
 
+def _ingest_pdf(pdf_path: str) -> Tuple[List[Dict], str, str]:
+    """Worker: parse one variant PDF into (entries, customer, product)."""
+    p = Path(pdf_path)
+    ents = parse_bom_pdf(p)
+    cust, prod = parse_pdf_metadata(p)
+    return ents, cust, prod
+
+
+def ingest_variants(specs: List[Tuple[str, Path]], jobs: int = 1
+                    ) -> Tuple[List[Tuple[str, List[Dict], str, str]], List[Tuple[str, Path, BaseException]]]:
+    """
+    Parse all variant PDFs, in worker processes when jobs > 1.
+    Returns (sheets, failures), both in -s order; one failing PDF
+    is reported without stopping the others.
+    """
+    results: Dict[int, Tuple[List[Dict], str, str]] = {}
+    errors: Dict[int, BaseException] = {}
+
+    if jobs > 1 and len(specs) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(specs))) as ex:
+            futs = {ex.submit(_ingest_pdf, str(pdf)): i for i, (_, pdf) in enumerate(specs)}
+            for fut in as_completed(futs):
+                i = futs[fut]
+                if fut.exception() is not None:
+                    errors[i] = fut.exception()
+                else:
+                    results[i] = fut.result()
+    else:
+        for i, (_, pdf) in enumerate(specs):
+            try:
+                results[i] = _ingest_pdf(str(pdf))
+            except Exception as exc:
+                errors[i] = exc
+
+    sheets: List[Tuple[str, List[Dict], str, str]] = []
+    failures: List[Tuple[str, Path, BaseException]] = []
+    for i, (var, pdf) in enumerate(specs):
+        if i in errors:
+            logging.error('Variant %s: failed to parse %s: %s', var, pdf, errors[i])
+            failures.append((var, pdf, errors[i]))
+        else:
+            ents, cust, prod = results[i]
+            logging.info('Variant %s: %d entries from %s', var, len(ents), pdf)
+            sheets.append((var, ents, cust, prod))
+    return sheets, failures
+
+
 def write_combined_excel(sheets: List[Tuple[str, List[Dict], str, str]], out_path: Path) -> None:
     """Generate and save the combined Excel sheet."""
     # prepare parts
@@ -222,8 +274,9 @@ def write_combined_excel(sheets: List[Tuple[str, List[Dict], str, str]], out_pat
     GROUP_ST = PN_COL + 1
     QTY_ST = GROUP_ST + 3
 
-    writer = pd.ExcelWriter(str(out_path), engine='xlsxwriter')
-    wb = writer.book
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(str(out_path))
     ws = wb.add_worksheet('Combined')
 
     # formats
@@ -325,7 +378,7 @@ def write_combined_excel(sheets: List[Tuple[str, List[Dict], str, str]], out_pat
     for rr in range(START_ROW, last_r + 1):
         ws.set_row(rr, 32.3)
 
-    writer.close()
+    wb.close()
     logging.info('Written Combined → %s', out_path)
 
 
@@ -338,19 +391,29 @@ def main() -> None:
                         help='Variant name + PDF path')
     parser.add_argument('-o', '--output', required=True,
                         help='Output XLSX path')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Worker processes for parsing variants concurrently')
     parser.add_argument('--log', default='INFO', help='Log level')
     args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
 
     setup_logging(args.log)
-    sheets: List[Tuple[str, List[Dict], str, str]] = []
+    specs: List[Tuple[str, Path]] = []
     for var, pdf in args.sheet:
         p = Path(pdf)
         if not p.is_file():
             logging.error('PDF not found: %s', pdf)
             sys.exit(1)
-        ents = parse_bom_pdf(p)
-        cust, prod = parse_pdf_metadata(p)
-        sheets.append((var, ents, cust, prod))
+        specs.append((var, p))
+
+    sheets, failures = ingest_variants(specs, jobs=args.jobs)
+    if not sheets:
+        logging.error('No variant could be parsed')
+        sys.exit(1)
+    if failures:
+        logging.warning('Writing %s without failed variant(s): %s',
+                        args.output, ', '.join(var for var, _, _ in failures))
 
     write_combined_excel(sheets, Path(args.output))
 
@@ -364,6 +427,9 @@ def main() -> None:
     except Exception:
         logging.warning("Couldn't auto-open %s", args.output)
 
+    if failures:
+        sys.exit(1)
+
 
 if __name__ == '__main__':
     main()
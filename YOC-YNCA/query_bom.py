@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Where-used and cross-product queries over the BOM database (convert.py).
+
+Questions:
+- where-used PART...   which products use a part, at which item, in what quantity
+- shared PRODUCT...    parts used by every one of the given products
+- unique PRODUCT       parts no other product uses (or none of --among)
+
+Part and product numbers may be typed full-width or ASCII; both are matched
+in the NFKC form the database stores. Lines struck out in red in the PDF are
+left out of every answer. Each question is one fixed, parameterized
+statement (product sets are passed as a JSON array), so SQLite prepares it
+once and answers from the indexes of the typed schema.
+
+Usage:
+  python query_bom.py where-used 766490-107A -d yazaki_bom.db
+  python query_bom.py shared 66401-070A 66401-080A --format csv
+  python query_bom.py unique 66401-080A --among 66401-070A --format json
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_DB = 'yazaki_bom.db'
+
+# ───────────── QUERIES ─────────────
+WHERE_USED = """
+SELECT pa.part_number, pr.product_number, pr.product_name, l.item_no, l.level, l.quantity,
+       pa.part_name, pa.note
+FROM parts pa
+JOIN bom_lines l ON l.part_id = pa.part_id
+JOIN products pr ON pr.product_id = l.product_id
+WHERE pa.part_number IN (SELECT value FROM json_each(?)) AND NOT l.struck
+ORDER BY pa.part_number, pr.product_number, l.page, l.line_id
+"""
+
+SHARED = """
+WITH chosen AS (
+    SELECT product_id FROM products WHERE product_number IN (SELECT value FROM json_each(?))
+), used AS (
+    SELECT pa.part_number, l.product_id, min(pa.part_name) AS part_name, sum(l.quantity) AS quantity
+    FROM chosen c
+    JOIN bom_lines l ON l.product_id = c.product_id
+    JOIN parts pa ON pa.part_id = l.part_id
+    WHERE pa.part_number != '' AND NOT l.struck
+    GROUP BY pa.part_number, l.product_id
+), everywhere AS (
+    SELECT part_number FROM used GROUP BY part_number HAVING count(*) = (SELECT count(*) FROM chosen)
+)
+SELECT u.part_number, u.part_name, pr.product_number, u.quantity
+FROM used u
+JOIN everywhere e ON e.part_number = u.part_number
+JOIN products pr ON pr.product_id = u.product_id
+ORDER BY u.part_number, pr.product_number
+"""
+
+# ?1 product, ?2 products to compare against as a JSON array (null: every other product)
+UNIQUE = """
+SELECT pa.part_number, min(pa.part_name) AS part_name, sum(l.quantity) AS quantity,
+       group_concat(l.item_no, ' ') AS items
+FROM products pr
+JOIN bom_lines l ON l.product_id = pr.product_id
+JOIN parts pa ON pa.part_id = l.part_id
+WHERE pr.product_number = ?1 AND pa.part_number != '' AND NOT l.struck
+  AND NOT EXISTS (
+    SELECT 1
+    FROM parts p2
+    JOIN bom_lines l2 ON l2.part_id = p2.part_id
+    WHERE p2.part_number = pa.part_number AND l2.product_id != pr.product_id AND NOT l2.struck
+      AND (?2 IS NULL OR l2.product_id IN (
+        SELECT product_id FROM products WHERE product_number IN (SELECT value FROM json_each(?2))))
+  )
+GROUP BY pa.part_number
+ORDER BY min(l.line_id)
+"""
+
+def nfkc(text: str) -> str:
+    return unicodedata.normalize('NFKC', text).strip()
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    """Open the database read-only (so a running load is never blocked or changed)."""
+    if not db_path.is_file():
+        raise FileNotFoundError(f'database not found: {db_path}')
+    conn = sqlite3.connect(f'{db_path.resolve().as_uri()}?mode=ro', uri=True)
+    if 'struck' not in {r[1] for r in conn.execute('PRAGMA table_info(bom_lines)')}:
+        conn.close()
+        raise sqlite3.DatabaseError(f'{db_path} predates the current schema; run convert.py on it first')
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def missing_products(conn: sqlite3.Connection, products: Sequence[str]) -> List[str]:
+    found = {r[0] for r in conn.execute(
+        'SELECT product_number FROM products WHERE product_number IN (SELECT value FROM json_each(?))',
+        (json.dumps(list(products)),))}
+    return [p for p in products if p not in found]
+
+def where_used(conn: sqlite3.Connection, parts: Sequence[str]) -> List[Dict]:
+    return [dict(r) for r in conn.execute(WHERE_USED, (json.dumps([nfkc(p) for p in parts]),))]
+
+def shared_parts(conn: sqlite3.Connection, products: Sequence[str]) -> List[Dict]:
+    return [dict(r) for r in conn.execute(SHARED, (json.dumps([nfkc(p) for p in products]),))]
+
+def unique_parts(conn: sqlite3.Connection, product: str, among: Optional[Sequence[str]] = None) -> List[Dict]:
+    others = None if among is None else json.dumps([nfkc(p) for p in among])
+    return [dict(r) for r in conn.execute(UNIQUE, (nfkc(product), others))]
+
+# ───────────── OUTPUT ─────────────
+def write_rows(rows: List[Dict], fmt: str, out=sys.stdout) -> None:
+    if fmt == 'json':
+        json.dump(rows, out, ensure_ascii=False, indent=2)
+        out.write('\n')
+        return
+    if not rows:
+        return
+    cols = list(rows[0])
+    if fmt == 'csv':
+        w = csv.DictWriter(out, fieldnames=cols, lineterminator='\n')
+        w.writeheader()
+        w.writerows(rows)
+        return
+    text = [[('' if r[c] is None else str(r[c])) for c in cols] for r in rows]
+    widths = [max(len(c), *(len(t[i]) for t in text)) for i, c in enumerate(cols)]
+    print('  '.join(c.ljust(w) for c, w in zip(cols, widths)), file=out)
+    for t in text:
+        print('  '.join(v.ljust(w) for v, w in zip(t, widths)).rstrip(), file=out)
+
+# ───────────── CLI ─────────────
+def main() -> None:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-d', '--db', type=Path, default=Path(DEFAULT_DB),
+                        help='SQLite database path (default: %(default)s)')
+    common.add_argument('--format', choices=['table', 'json', 'csv'], default='table',
+                        help='Output format (default: %(default)s)')
+    common.add_argument('--timing', action='store_true', help='Report the query time on stderr')
+    parser = argparse.ArgumentParser(description='Query the BOM database built by convert.py')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('where-used', parents=[common], help='Products that use the given part numbers')
+    p.add_argument('parts', nargs='+', metavar='PART')
+    p = sub.add_parser('shared', parents=[common], help='Parts used by every one of the given products')
+    p.add_argument('products', nargs='+', metavar='PRODUCT')
+    p = sub.add_parser('unique', parents=[common], help='Parts of PRODUCT that no other product uses')
+    p.add_argument('product', metavar='PRODUCT')
+    p.add_argument('--among', nargs='+', metavar='PRODUCT',
+                   help='Only compare against these products (default: every other product)')
+    args = parser.parse_args()
+
+    try:
+        conn = connect(args.db)
+    except (OSError, sqlite3.Error) as exc:
+        parser.error(str(exc))
+
+    named = ([args.product] + (args.among or []) if args.command == 'unique'
+             else args.products if args.command == 'shared' else [])
+    unknown = missing_products(conn, [nfkc(p) for p in named])
+    if unknown:
+        print(f"Unknown product(s): {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    t0 = time.perf_counter()
+    if args.command == 'where-used':
+        rows = where_used(conn, args.parts)
+    elif args.command == 'shared':
+        rows = shared_parts(conn, args.products)
+    else:
+        rows = unique_parts(conn, args.product, args.among)
+    elapsed = time.perf_counter() - t0
+    conn.close()
+
+    write_rows(rows, args.format)
+    if args.timing:
+        print(f'{len(rows)} row(s) in {elapsed * 1000:.2f} ms', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
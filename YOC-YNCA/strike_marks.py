@@ -0,0 +1,94 @@
+"""
+Red-strike deletion marks on BOM PDF pages.
+
+A red line or curve anywhere on a page, or a red char in the item-number
+gutter, deletes the first item number found in the gutter from MARK_ABOVE
+points above the mark to MARK_BELOW points below it. YC-SOV_to_YNA-SOV.py
+drops those items while parsing; convert.py stores them as struck lines.
+Both use this module, so the rule is defined once.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import pdfplumber
+
+RED = (1.0, 0.0, 0.0)
+GUTTER_X1 = 103        # right edge of the item-number gutter
+MARK_ABOVE = 13        # a red mark resolves the first item number within
+MARK_BELOW = 10        # [top - MARK_ABOVE, bottom + MARK_BELOW] of the mark
+
+class DeletionMark(NamedTuple):
+    kind: str              # 'line' | 'curve' | 'char'
+    top: float
+    bottom: float
+    x0: float
+    item: Optional[int]    # gutter item number it deletes (None if nothing in range)
+
+class GutterIndex:
+    """Item-number words of a page's left gutter, sorted by vertical position.
+
+    Built once per page; :meth:`lookup` resolves a vertical band with a bisect
+    instead of cropping and re-extracting the gutter text for every red mark,
+    and repeated bands (several marks on the same row) are answered from a memo.
+    """
+
+    def __init__(self, page: "pdfplumber.page.Page"):
+        x0, top, _, bottom = page.bbox
+        words = page.crop((x0, top, GUTTER_X1, bottom)).extract_words()
+        words.sort(key=lambda w: w['top'])
+        self._words = words
+        self._tops = [w['top'] for w in words]
+        self._max_h = max((w['bottom'] - w['top'] for w in words), default=0.0)
+        self._memo: Dict[Tuple[float, float], Optional[int]] = {}
+
+    def lookup(self, top: float, bottom: float) -> Optional[int]:
+        """First integer in reading order among gutter words intersecting [top, bottom]."""
+        key = (top, bottom)
+        if key in self._memo:
+            return self._memo[key]
+        from pdfplumber.utils import cluster_objects
+
+        lo = bisect_left(self._tops, top - self._max_h)
+        hi = bisect_right(self._tops, bottom)
+        # clip to the band like page.crop() would, then read lines top-down, left-right
+        hits = [
+            {**w, 'top': max(w['top'], top)}
+            for w in self._words[lo:hi] if w['bottom'] >= top
+        ]
+        item = None
+        for line in cluster_objects(hits, itemgetter('top'), 3):
+            for w in sorted(line, key=itemgetter('x0')):
+                m = re.search(r"\d+", w['text'])
+                if m:
+                    item = int(m.group(0))
+                    break
+            if item is not None:
+                break
+        self._memo[key] = item
+        return item
+
+def get_deletion_marks(page: "pdfplumber.page.Page") -> List[DeletionMark]:
+    """All red marks on a page (lines, curves, gutter chars) with the item each one deletes."""
+    marks: List[DeletionMark] = []
+    index: Optional[GutterIndex] = None
+
+    red = [('line', l) for l in getattr(page, "lines", []) if l.get('stroking_color') == RED]
+    red += [('curve', c) for c in getattr(page, "curves", []) if c.get('stroking_color') == RED]
+    red += [
+        ('char', ch) for ch in getattr(page, "chars", [])
+        if ch.get('non_stroking_color') == RED and ch.get('x0', 9999) < GUTTER_X1
+    ]
+    for kind, obj in red:
+        if index is None:
+            index = GutterIndex(page)
+        item = index.lookup(obj['top'] - MARK_ABOVE, obj['bottom'] + MARK_BELOW)
+        marks.append(DeletionMark(kind, obj['top'], obj['bottom'], obj['x0'], item))
+    return marks
+
+def get_deleted_indices(page: "pdfplumber.page.Page") -> Set[int]:
+    """Find gutter indices marked red (line/text) and return set of ints (e.g., 68 from '68.1')."""
+    return {m.item for m in get_deletion_marks(page) if m.item is not None}
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Synthetic YC-format BOM PDF generator (for benchmarks).
+
+Writes BOM PDFs laid out like the customer's production drawings: product
+name/number block, JP/EN header row, 階層/LEVEL sub-columns, bilingual
+part-name cells (some with multi-line English), a 備考/NOTE column and
+red-strike deleted items. Any number of pages and variants can be generated;
+variants share a base BOM and differ by dropped rows, quantities, changes
+and strikes, like real harness variants do.
+
+The PDF is written directly (no PDF library needed) with the non-embedded
+HeiseiMin-W3 CID font, which pdfminer decodes through its bundled
+Adobe-Japan1 CMaps.
+
+Usage:
+  python synth_bom.py -o bench_pdfs --pages 50 --variants 10
+"""
+
+import argparse
+import logging
+import random
+import zlib
+from pathlib import Path
+from typing import List, NamedTuple, Tuple
+
+# ───────────── PAGE GEOMETRY ─────────────
+PAGE_W, PAGE_H = 595.32, 841.92
+TABLE_TOP = 52.1
+TABLE_BOTTOM = 816.0
+FOOTER_H = 7.4
+# every column boundary of the real table (26 columns, like page 1 of the PDFs)
+ALL_XS = [83.4, 99.96, 111.19, 122.24, 133.27, 144.32, 155.16, 160.68, 182.76, 188.28,
+          204.87, 226.95, 249.03, 271.11, 282.15, 293.19, 315.29, 320.81, 326.33, 348.41,
+          370.69, 403.61, 442.44, 453.32, 475.4, 497.48, 574.78]
+INFO_XS = [83.4, 160.68, 326.33, 403.61, 574.78]
+HEADER_XS = [83.4, 99.96, 155.16, 293.19, 320.81, 348.41, 453.32, 475.4, 574.78]
+DATA_XS = [83.4, 99.96, 111.19, 122.24, 133.27, 144.32, 155.16, 293.19, 320.81, 348.41,
+           453.32, 475.4, 574.78]
+INFO_ROW_H = (28.5, 28.6)
+HEADER_H = 21.6
+ROW_H = 21.6        # JP line + one EN line
+TALL_ROW_H = 31.8   # JP line + two EN lines
+LINE_STEP = 10.2
+TEXT_SIZE = 9
+PN_SIZE = 11
+ITEM_X = 87.7
+
+# HeiseiMin-W3 metrics; chars are `size` tall with the baseline `DESCENT` below
+DESCENT = -141
+
+# ───────────── BOM CONTENT ─────────────
+PARTS = [
+    ('コネクタ', 'CONNECTOR'), ('端子', 'TERMINAL'), ('電線', 'WIRE'), ('ケース', 'CASE'),
+    ('カバー', 'COVER'), ('タッピングネジ', 'TAPPING SCREW'), ('ラベル', 'LABEL'),
+    ('テープ', 'TAPE'), ('クランプ', 'CLAMP'), ('プロテクタ', 'PROTECTOR'),
+    ('グロメット', 'GROMMET'), ('チューブ', 'TUBE'), ('ブラケット', 'BRACKET'),
+]
+SUFFIXES = ['ASSY', 'L', 'R', 'UPPER', 'LOWER', 'M3', '2P', '4P', 'HOUSING', 'SHIELD', 'REAR', 'FRONT']
+TRIVIAL_NOTE = '欠図\nin preparation'
+ROWS_PER_PAGE = 40  # more than a page holds; the base BOM is cut to whole pages
+MAX_LINE_CHARS = 22  # English characters that fit the part-name cell
+FORMAT_VERSION = 1   # part of the file names; bump when the generated PDFs change
+
+class SynthRow(NamedTuple):
+    level: int
+    part_number: str
+    name_jp: str
+    name_en: Tuple[str, ...]  # one or two English lines
+    change: str
+    quantity: str
+    note: str
+    struck: bool = False
+
+def fullwidth(s: str) -> str:
+    """Digits and capitals as full-width forms, like the drawings print part numbers."""
+    return ''.join(chr(ord(c) + 0xFEE0) if c.isalnum() and c.isascii() else c for c in s)
+
+def make_base_bom(n_rows: int, seed: int = 0) -> List[SynthRow]:
+    """A BOM of ``n_rows`` rows: level-1 assemblies, each with a tree of sub-parts."""
+    rng = random.Random(seed)
+    rows = [SynthRow(1, '', '外観図', ('OUTLINE DRAWING',), '', '', TRIVIAL_NOTE)]
+    level = 1
+    while len(rows) < n_rows:
+        if level == 1 or rng.random() < 0.04:
+            level = 1
+        else:
+            level = max(2, min(5, level + rng.choice((-1, 0, 0, 1))))
+        jp, en = rng.choice(PARTS)
+        words = [en] + rng.sample(SUFFIXES, rng.randint(0, 2))
+        name = ' '.join(words)
+        if len(name) > MAX_LINE_CHARS:
+            cut = name.rindex(' ', 0, MAX_LINE_CHARS)
+            en_lines: Tuple[str, ...] = (name[:cut], name[cut + 1:])
+        elif len(name) > 12 and rng.random() < 0.3:
+            cut = rng.randint(4, len(name) - 4)   # drawings wrap long names, often mid-word
+            en_lines = (name[:cut].rstrip(), name[cut:].lstrip())
+        else:
+            en_lines = (name,)
+        r = rng.random()
+        note = TRIVIAL_NOTE if r < 0.08 else (f'Use with {rng.choice(SUFFIXES)} side' if r < 0.15 else '')
+        rows.append(SynthRow(
+            level=level,
+            part_number=fullwidth(f'{rng.randint(100000, 999999)}-{rng.randint(0, 999):03d}A'),
+            name_jp=jp,
+            name_en=en_lines,
+            change=rng.choice(('', '', '', '△1', '△2', '△3')),
+            quantity='' if level == 1 else rng.choice(('1', '1', '1', '2', '4', '0.5')),
+            note=note,
+        ))
+        if level == 1:
+            level = 2
+    return rows
+
+def make_variant(base: List[SynthRow], variant: int, seed: int = 0) -> List[SynthRow]:
+    """Derive a variant: drop some sub-parts, change quantities, strike a few items."""
+    rng = random.Random(seed * 7919 + variant)
+    rows: List[SynthRow] = []
+    for row in base:
+        if row.level > 2 and rng.random() < 0.05:
+            continue
+        if row.quantity and rng.random() < 0.1:
+            row = row._replace(quantity=str(rng.choice((1, 2, 3, 6))))
+        if row.level > 1 and rng.random() < 0.03:
+            row = row._replace(struck=True)
+        rows.append(row)
+    return rows
+
+# ───────────── PDF WRITER ─────────────
+def _hex(s: str) -> str:
+    return s.encode('utf-16-be').hex().upper()
+
+class _Page:
+    """Content stream builder for one page (top-down coordinates, like pdfplumber)."""
+
+    def __init__(self):
+        self.ops: List[str] = ['0.14 w 0 G']
+
+    def text(self, x: float, top: float, s: str, size: float = TEXT_SIZE) -> None:
+        if s:
+            y = PAGE_H - top - size - DESCENT * size / 1000
+            self.ops.append(f'BT /F1 {size:g} Tf 1 0 0 1 {x:.2f} {y:.2f} Tm <{_hex(s)}> Tj ET')
+
+    def lines(self, x: float, top: float, lines: List[str], size: float = TEXT_SIZE) -> None:
+        for i, s in enumerate(lines):
+            self.text(x, top + i * LINE_STEP, s, size)
+
+    def hline(self, x0: float, x1: float, top: float) -> None:
+        y = PAGE_H - top
+        self.ops.append(f'{x0:.2f} {y:.2f} m {x1:.2f} {y:.2f} l S')
+
+    def vline(self, x: float, top: float, bottom: float) -> None:
+        self.ops.append(f'{x:.2f} {PAGE_H - top:.2f} m {x:.2f} {PAGE_H - bottom:.2f} l S')
+
+    def strike(self, x0: float, x1: float, top: float) -> None:
+        y = PAGE_H - top
+        self.ops.append(f'q 1 0 0 RG 0.6 w {x0:.2f} {y:.2f} m {x1:.2f} {y:.2f} l S Q')
+
+    def row(self, xs: List[float], top: float, bottom: float) -> None:
+        """Cell borders of one table row: its top edge and its verticals."""
+        self.hline(xs[0], xs[-1], top)
+        for x in xs:
+            self.vline(x, top, bottom)
+
+    def stream(self) -> bytes:
+        return zlib.compress('\n'.join(self.ops).encode('ascii'))
+
+def _row_height(row: SynthRow) -> float:
+    return TALL_ROW_H if len(row.name_en) > 1 or row.note.count('\n') > 1 else ROW_H
+
+def _paginate(rows: List[SynthRow]) -> List[List[SynthRow]]:
+    pages: List[List[SynthRow]] = [[]]
+    y = TABLE_TOP + sum(INFO_ROW_H) + HEADER_H
+    for row in rows:
+        h = _row_height(row)
+        if y + h > TABLE_BOTTOM and pages[-1]:
+            pages.append([])
+            y = TABLE_TOP + sum(INFO_ROW_H) + HEADER_H
+        pages[-1].append(row)
+        y += h
+    return pages
+
+def _draw_page(rows: List[SynthRow], first_item: int, page_no: int, n_pages: int,
+               product: str, customer: str, title: str, note_header: bool = True) -> _Page:
+    pg = _Page()
+    pg.text(274, 18, '目 次', 16)
+    pg.text(533, 18, 'PAGE', 10)
+    pg.text(291, 31, 'CONTENTS', 7)
+    pg.text(473, 29, '生産図', 10)
+    pg.text(541, 29, f'{page_no} / {n_pages}', 10)
+    pg.text(450, 40, 'PRODUCTION DRAWING', 8)
+
+    # product name / number block
+    top = TABLE_TOP
+    info = [
+        (('製品名称', 'PRODUCT NAME'), title, ('納入先', 'CUSTOMER'), 'TEMA'),
+        (('製品番号', 'PRODUCT NUMBER'), product, ('納入先品番', "CUSTOMER'S NUMBER"), customer),
+    ]
+    for h, (label, value, c_label, c_value) in zip(INFO_ROW_H, info):
+        pg.row(INFO_XS, top, top + h)
+        pg.text(INFO_XS[0] + 3, top + 3, label[0], 8)
+        pg.text(INFO_XS[0] + 3, top + 17, label[1], 8)
+        pg.text(INFO_XS[1] + 5, top + 10, value, PN_SIZE)
+        pg.text(INFO_XS[2] + 3, top + 3, c_label[0], 8)
+        pg.text(INFO_XS[2] + 3, top + 17, c_label[1], 8)
+        pg.text(INFO_XS[3] + 5, top + 10, c_value, PN_SIZE)
+        top += h
+
+    # header row
+    pg.row(HEADER_XS, top, top + HEADER_H)
+    labels = [('階層', 'LEVEL'), ('部 品 番 号', 'PART NUMBER'), ('変更', 'CHANGE'), ('図番', 'DRAW.NO.'),
+              ('部 品 名 称', 'PART NAME'), ('個数', 'QTY'), ('備 考', 'NOTE') if note_header else ('', '')]
+    for x, x_next, (jp, en) in zip(HEADER_XS[1:], HEADER_XS[2:], labels):
+        pg.lines(x + 2, top + 1, [jp, en], 6 if len(en) * 4 > x_next - x else 8)
+    top += HEADER_H
+
+    # data rows
+    for n, row in enumerate(rows):
+        h = _row_height(row)
+        pg.row(DATA_XS, top, top + h)
+        mid = top + (h - TEXT_SIZE) / 2
+        item = first_item + n
+        pg.text(ITEM_X, mid, str(item))
+        pg.text(DATA_XS[row.level] + 3.8, mid, str(row.level))
+        pg.text(DATA_XS[6] + 2, top + (h - PN_SIZE) / 2, row.part_number, PN_SIZE)
+        pg.text(DATA_XS[7] + 6, mid, row.change)
+        pg.text(DATA_XS[8] + 9, mid, str(item))
+        pg.lines(DATA_XS[9] + 1.8, top + 0.6, [row.name_jp, *row.name_en])
+        pg.text(DATA_XS[10] + 8, mid, row.quantity)
+        pg.lines(DATA_XS[11] + 2, top + 0.6, row.note.split('\n') if row.note else [])
+        if row.struck:
+            # red strikes through part number and name, clear of the cell borders
+            pg.strike(DATA_XS[6] + 6, DATA_XS[7] - 6, mid + 5)
+            pg.strike(DATA_XS[9] + 4, DATA_XS[10] - 6, mid + 0.5)
+            pg.strike(DATA_XS[9] + 4, DATA_XS[10] - 20, mid + 10.7)
+        top += h
+
+    # footer row spanning every column boundary, closing the table
+    pg.row(ALL_XS, top, top + FOOTER_H)
+    pg.hline(ALL_XS[0], ALL_XS[-1], top + FOOTER_H)
+    return pg
+
+def write_bom_pdf(path: Path, rows: List[SynthRow], product: str, customer: str,
+                  title: str = 'SYNTH-HARNESS', note_header: bool = True) -> int:
+    """Write ``rows`` as a YC-format BOM PDF; returns the page count.
+
+    With ``note_header=False`` the 備考/NOTE header cell is left blank, so
+    parsers have to fall back to their default column map for it.
+    """
+    pages = _paginate(rows)
+    objs: List[bytes] = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'',  # page tree, filled in below
+        b'<< /Type /Font /Subtype /Type0 /BaseFont /HeiseiMin-W3 /Encoding /UniJIS-UCS2-H '
+        b'/DescendantFonts [4 0 R] >>',
+        b'<< /Type /Font /Subtype /CIDFontType0 /BaseFont /HeiseiMin-W3 '
+        b'/CIDSystemInfo << /Registry (Adobe) /Ordering (Japan1) /Supplement 2 >> '
+        b'/FontDescriptor 5 0 R /DW 1000 /W [1 95 500 231 632 500] >>',
+        b'<< /Type /FontDescriptor /FontName /HeiseiMin-W3 /Flags 6 /FontBBox [0 -141 1000 859] '
+        b'/ItalicAngle 0 /Ascent 859 /Descent -141 /CapHeight 680 /StemV 80 >>',
+    ]
+    kids = []
+    item = 1
+    for n, page_rows in enumerate(pages, start=1):
+        data = _draw_page(page_rows, item, n, len(pages), product, customer, title, note_header).stream()
+        item += len(page_rows)
+        objs.append(b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(data) + data + b'\nendstream')
+        objs.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] '
+                    b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>'
+                    % (PAGE_W, PAGE_H, len(objs)))
+        kids.append(b'%d 0 R' % len(objs))
+    objs[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % i + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objs) + 1)
+    out += b''.join(b'%010d 00000 n \n' % off for off in offsets)
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objs) + 1, xref)
+    Path(path).write_bytes(bytes(out))
+    return len(pages)
+
+def generate_variants(out_dir: Path, pages: int, variants: int, seed: int = 0,
+                      note_header: bool = True) -> List[Path]:
+    """Write ``variants`` BOM PDFs of at most ``pages`` pages each; returns their paths.
+
+    Files that already exist are kept, so a directory doubles as a cache.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    # as many rows as fill `pages` pages of the base BOM; variants drop a few
+    base = [row for page in _paginate(make_base_bom(pages * ROWS_PER_PAGE, seed))[:pages] for row in page]
+    paths = []
+    for v in range(variants):
+        suffix = '' if note_header else '_nonote'
+        path = out_dir / f'synth{FORMAT_VERSION}_p{pages}_s{seed}_v{v:03d}{suffix}.pdf'
+        if not path.exists():
+            write_bom_pdf(path, make_variant(base, v, seed), product=fullwidth(f'66401-{v:03d}A'),
+                          customer=f'83108-AN{v:03d}', note_header=note_header)
+        paths.append(path)
+    return paths
+
+# ───────────── CLI ─────────────
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Generate synthetic YC-format BOM PDFs')
+    parser.add_argument('-o', '--out-dir', type=Path, required=True, help='Directory for the PDFs')
+    parser.add_argument('--pages', type=int, default=3, help='Pages per BOM (default: %(default)s)')
+    parser.add_argument('--variants', type=int, default=1, help='Number of variant PDFs (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: %(default)s)')
+    args = parser.parse_args()
+    if args.pages < 1 or args.variants < 1:
+        parser.error('--pages and --variants must be at least 1')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(message)s')
+    for path in generate_variants(args.out_dir, args.pages, args.variants, args.seed):
+        logging.info('Wrote %s', path)
+
+if __name__ == '__main__':
+    main()
@@ -17,10 +17,11 @@ import subprocess
 import sys
 import unicodedata
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Set
 
-import pdfplumber
-import pandas as pd
+# pdfplumber and pandas are imported by the code that needs them
+if TYPE_CHECKING:
+    import pdfplumber
 
 # ──────────────────────────────────────────────────────────────────────────────
 BLANK_WIDTHS = [4.22, 16.67, 43.47, 18.22, 17.78, 6.78, 13.78, 13.78, 13.78]
@@ -81,7 +82,7 @@ def normalize_note(s: str) -> str:
     return s.lower()
 
 # ───────────── RED/STRIKE DELETION DETECTION ─────────────
-def get_deleted_indices(page: pdfplumber.page.Page) -> Set[int]:
+def get_deleted_indices(page: "pdfplumber.page.Page") -> Set[int]:
     """Find gutter indices marked red (line/text) and return set of ints (e.g., 68 from '68.1')."""
     deleted: Set[int] = set()
 
@@ -131,6 +132,8 @@ def parse_index_int(idx_text: str) -> Optional[int]:
 
 # ───────────── PDF PARSE ─────────────
 def parse_bom_pdf(pdf_path: Path) -> List[Dict]:
+    import pdfplumber
+
     entries: List[Dict] = []
     with pdfplumber.open(str(pdf_path)) as pdf:
         for page in pdf.pages:
@@ -276,6 +279,8 @@ def parse_bom_pdf(pdf_path: Path) -> List[Dict]:
 
 # ───────────── METADATA ─────────────
 def parse_pdf_metadata(pdf_path: Path) -> Tuple[str, str]:
+    import pdfplumber
+
     with pdfplumber.open(str(pdf_path)) as pdf:
         full_text = "".join(page.extract_text() or "" for page in pdf.pages)
     lines = [ln.strip() for ln in full_text.splitlines() if ln.strip()]
@@ -354,6 +359,8 @@ def write_combined_excel(sheets: List[Tuple[str, List[Dict], str, str]], out_pat
     GROUP_ST = PN_COL + 1
     QTY_ST = GROUP_ST + 3
 
+    import pandas as pd
+
     writer = pd.ExcelWriter(str(out_path), engine='xlsxwriter')
     wb = writer.book
     ws = wb.add_worksheet('Combined')